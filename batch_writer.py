@@ -0,0 +1,121 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing             import Callable
+
+import logging
+import threading
+import time
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+class MicroBatchWriter:
+    def __init__(self,
+                 write: Callable[[list[dict]], None],
+                 batch_size: int = 200,
+                 flush_interval: float = 5.0,
+                 max_in_flight: int = 2):
+        """
+        Buffers records and hands them to `write` in micro-batches on background threads,
+        so database writes overlap with fetching and parsing.
+
+        A batch is sent once it holds batch_size records, or by a flusher thread once records
+        waited flush_interval seconds, even if the crawl stalls in between. add() blocks while
+        max_in_flight batches are still being written, which bounds memory if the database is
+        slower than the crawl.
+
+        Records are numbered in the order they are added; `acknowledged` is the number of
+        leading records whose batches were all written, e.g. to checkpoint a crawl.
+
+        Args:
+            write (Callable[[list[dict]], None]): Writes one batch, raising on failure.
+            batch_size (int): Records per batch. Default is 200
+            flush_interval (float): Maximum seconds a record waits in the buffer. Default is 5.0
+            max_in_flight (int): Maximum number of batches being written concurrently. Default is 2
+        """
+        self.write = write
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.batches = 0
+
+        self.added = 0
+        self.acknowledged = 0
+
+        self._buffer: list[dict] = []
+        self._buffer_since = None
+        self._buffer_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight)
+        self._lock = threading.Lock()
+        self._errors: list[Exception] = []
+        # Batches written out of order, as (first record, end), until the ones before them are written too
+        self._written_ranges: dict[int, int] = {}
+
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_periodically, daemon=True)
+        self._flusher.start()
+
+    def add(self, record: dict):
+        with self._buffer_lock:
+            if not self._buffer:
+                self._buffer_since = time.monotonic()
+            self._buffer.append(record)
+            self.added += 1
+            if len(self._buffer) >= self.batch_size:
+                self._send_buffer()
+
+    def flush(self):
+        """
+        Sends the buffered records as one batch, waiting for a free in-flight slot.
+        """
+        with self._buffer_lock:
+            self._send_buffer()
+
+    def _send_buffer(self):
+        if not self._buffer:
+            return
+
+        batch, self._buffer = self._buffer, []
+        first = self.added - len(batch)
+        self._slots.acquire()
+        self._executor.submit(self._write_batch, batch, first)
+
+    def _flush_periodically(self):
+        while not self._closed.wait(self.flush_interval / 2):
+            with self._buffer_lock:
+                if self._buffer and time.monotonic() - self._buffer_since >= self.flush_interval:
+                    self._send_buffer()
+
+    def _write_batch(self, batch: list[dict], first: int):
+        try:
+            self.write(batch)
+            with self._lock:
+                self.written += len(batch)
+                self.batches += 1
+                self._written_ranges[first] = first + len(batch)
+                while self.acknowledged in self._written_ranges:
+                    self.acknowledged = self._written_ranges.pop(self.acknowledged)
+        except Exception as error:
+            LOGGER.error(f"Error writing batch of {len(batch)} records: {error}")
+            with self._lock:
+                self._errors.append(error)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """
+        Flushes what is left and waits for every batch. Raises if any batch failed.
+        """
+        self._closed.set()
+        self._flusher.join()
+        self.flush()
+        self._executor.shutdown(wait=True)
+        if self._errors:
+            raise Exception(f"{len(self._errors)} batch write(s) failed, first error: {self._errors[0]}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
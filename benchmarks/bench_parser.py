@@ -0,0 +1,81 @@
+"""
+Micro-benchmark of the header-indexed page parser against the previous
+per-cell BeautifulSoup lookups, on a saved /deviden/page/{page} listing.
+
+Usage:
+    python benchmarks/bench_parser.py [path/to/saved_page.html] [--number N]
+"""
+from bs4      import BeautifulSoup
+from datetime import datetime
+from pathlib  import Path
+
+import argparse
+import sys
+import timeit
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from page_parser import parse_dividend_page  # noqa: E402
+
+
+_DEFAULT_PAGE = Path(__file__).resolve().parent / "fixtures" / "deviden_page.html"
+
+
+def legacy_parse(html: str) -> list[tuple]:
+    """
+    The row loop as it was before page_parser: six find() calls per <tr> on the whole document.
+    """
+    soup = BeautifulSoup(html, "lxml")
+    parsed = []
+    for row in soup.find_all("tr"):
+        try:
+            symbol = row.find("td", {"data-header": "Nama"})
+            dividend = row.find("td", {"data-header": "Amount"})
+            ex_date = row.find("td", {"data-header": "Ex Date"})
+            payment_date = row.find("td", {"data-header": "Payment Date"})
+            recording_date = row.find("td", {"data-header": "Recording Date"})
+            cum_date = row.find("td", {"data-header": "Cum Date"})
+
+            if not (symbol and dividend and ex_date):
+                continue
+
+            parsed.append((
+                symbol.text.strip(),
+                float(dividend.text.strip()),
+                datetime.strptime(ex_date.text.strip(), "%d-%b-%Y").strftime("%Y-%m-%d"),
+                datetime.strptime(cum_date.text.strip(), "%d-%b-%Y").strftime("%Y-%m-%d"),
+                datetime.strptime(recording_date.text.strip(), "%d-%b-%Y").strftime("%Y-%m-%d"),
+                datetime.strptime(payment_date.text.strip(), "%d-%b-%Y").strftime("%Y-%m-%d"),
+            ))
+        except (ValueError, TypeError):
+            continue
+    return parsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("page", nargs="?", default=_DEFAULT_PAGE, type=Path)
+    parser.add_argument("--number", type=int, default=200, help="Parses per measurement")
+    args = parser.parse_args()
+
+    html = args.page.read_text(encoding="utf-8")
+
+    legacy_rows = legacy_parse(html)
+    new_rows = [tuple(row) for row in parse_dividend_page(html).rows]
+    if legacy_rows != new_rows:
+        raise SystemExit("Parsers disagree on the saved page, refusing to benchmark")
+
+    print(f"{args.page.name}: {len(new_rows)} dividend rows, {len(html) / 1024:.1f} KiB")
+
+    results = {}
+    for name, func in (("legacy (BeautifulSoup find)", legacy_parse), ("page_parser (lxml XPath)", parse_dividend_page)):
+        best = min(timeit.repeat(lambda: func(html), number=args.number, repeat=5)) / args.number
+        results[name] = best
+        print(f"  {name:<28} {best * 1e3:8.3f} ms/page")
+
+    legacy, new = results.values()
+    print(f"  speed-up: {legacy / new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
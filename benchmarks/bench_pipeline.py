@@ -0,0 +1,268 @@
+"""
+Offline benchmark and regression check of the scraping pipeline.
+
+Each scenario runs against a local server replaying the recorded listing page, an
+in-memory Supabase and a stub price source (see offline.py), with the clock pinned
+to the recording. It reports pages/s, rows/s, DB calls and peak traced memory for:
+
+- daily:    DividendChecker.get_dividend_records + upsert_to_db
+- backfill: DividendChecker.check_fill_missing_dividend
+- yield:    DividendChecker.upsert_yield_in_db
+- upcoming: FutureDividendChecker.get_dividend_records + upsert_to_db
+
+Pages, rows and DB calls are deterministic and must match baseline.json exactly
+(fewer pages or DB calls is reported as an improvement). Throughput and memory are
+compared with a tolerance, since they depend on the machine the baseline was taken on.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--repeat N] [--tolerance 0.5] [--update-baseline]
+"""
+from contextlib import closing, redirect_stdout
+from datetime   import date, timedelta
+from pathlib    import Path
+
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from offline import FakeSupabase, FixtureServer, StubPriceSource, recorded_listing  # noqa: E402
+
+
+_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+
+# The recorded page holds ex-dates from 13-Sep-2024 to 29-Sep-2024
+_TODAY = date(2024, 9, 20)
+_LISTING_PAGES = 30
+_BACKFILL_CUTOFF = "2023-10-01"
+
+# Metrics that must match the baseline exactly, and the direction in which a change is a regression
+_EXACT_METRICS = {"pages": 1, "db_calls": 1, "rows": 0}
+
+
+def _listing_records(pages: list[bytes]) -> list[dict]:
+    from page_parser import parse_dividend_page
+
+    records = {}
+    for html in pages:
+        for row in parse_dividend_page(html).rows:
+            records[(row.symbol + ".JK", row.ex_date)] = {
+                "symbol": row.symbol + ".JK",
+                "date": row.ex_date,
+                "dividend": row.amount,
+                "dividend_original": row.amount,
+                "yield": None,
+                "updated_on": "2024-01-01 00:00:00",
+            }
+    return list(records.values())
+
+
+class Environment:
+    def __init__(self, server: FixtureServer, records: list[dict], tables: dict[str, list[dict]]):
+        from fetcher         import PageFetcher
+        from symbol_universe import SymbolUniverse
+
+        self.server = server
+        self.records = records
+        self.supabase = FakeSupabase(tables)
+        self.price_source = StubPriceSource()
+        self.fetcher = PageFetcher(server.url_template, rate=10000, burst=10000)
+        self.allowed_symbols = SymbolUniverse(self.supabase, path=Path(tempfile.mkdtemp()) / "symbols.json")
+
+    def checker(self, checker_class, **kwargs):
+        return checker_class(self.supabase, fetcher=self.fetcher, allowed_symbols=self.allowed_symbols, **kwargs)
+
+    def table(self, name: str) -> list[dict]:
+        return self.supabase.tables.get(name, [])
+
+
+def _company_profiles(records: list[dict]) -> list[dict]:
+    return [{"symbol": symbol} for symbol in sorted({record["symbol"] for record in records})]
+
+
+def run_daily(env: Environment) -> int:
+    from dividend_checker import DividendChecker
+
+    checker = env.checker(DividendChecker, price_source=env.price_source)
+    checker.start_date = (_TODAY - timedelta(days=29)).isoformat()
+    checker.end_date = _TODAY.isoformat()
+    checker.get_dividend_records(include_payment_date=True)
+    checker.upsert_to_db()
+    return len(env.table("idx_dividend"))
+
+
+def run_backfill(env: Environment) -> int:
+    from dividend_checker import DividendChecker
+
+    env.supabase.tables["idx_dividend"] = [dict(record) for record in env.records[::2]]
+    before = len(env.table("idx_dividend"))
+    checker = env.checker(DividendChecker, price_source=env.price_source)
+    checker.check_fill_missing_dividend(is_saved=False, cutoff_date=_BACKFILL_CUTOFF)
+    return len(env.table("idx_dividend")) - before
+
+
+def run_yield(env: Environment) -> int:
+    from dividend_checker import DividendChecker
+
+    env.supabase.tables["idx_dividend"] = [dict(record) for record in env.records]
+    checker = env.checker(DividendChecker, price_source=env.price_source)
+    checker.upsert_yield_in_db()
+    return sum(1 for row in env.table("idx_dividend") if row["yield"] is not None)
+
+
+def run_upcoming(env: Environment) -> int:
+    import future_dividend_checker
+    from future_dividend_checker import FutureDividendChecker
+
+    future_dividend_checker._LOCAL_TODAY = _TODAY
+    checker = env.checker(FutureDividendChecker)
+    checker.start_date = _TODAY.isoformat()
+    checker.end_date = (_TODAY + timedelta(days=14)).isoformat()
+
+    # Half of the window already stored, one of them with an outdated amount, plus rows past retention
+    upcoming = [{"symbol": record["symbol"], "ex_date": record["date"], "dividend_amount": record["dividend"],
+                 "cum_date": None, "recording_date": None, "payment_date": None}
+                for record in env.records if checker.start_date <= record["date"] <= checker.end_date][::2]
+    stale = [{"symbol": record["symbol"], "ex_date": record["date"], "dividend_amount": record["dividend"],
+              "payment_date": record["date"]}
+             for record in env.records if record["date"] < (_TODAY - timedelta(days=30)).isoformat()][:50]
+    env.supabase.tables["idx_upcoming_dividend"] = upcoming + stale
+
+    checker.get_dividend_records()
+    changes = checker.upsert_to_db()
+    return len(changes.inserted) + len(changes.updated) + len(changes.deleted)
+
+
+SCENARIOS = {
+    "daily": run_daily,
+    "backfill": run_backfill,
+    "yield": run_yield,
+    "upcoming": run_upcoming,
+}
+
+
+def measure(server: FixtureServer, records: list[dict], scenario, traced: bool = False) -> dict:
+    """
+    Runs a scenario once on fresh in-memory tables and returns its counters and timings.
+    """
+    env = Environment(server, records, {"idx_company_profile": _company_profiles(records)})
+    hits_before = server.hits
+
+    if traced:
+        tracemalloc.start()
+    started = time.perf_counter()
+    with closing(env.fetcher), redirect_stdout(io.StringIO()):
+        try:
+            rows = scenario(env)
+        except SystemExit:
+            rows = 0
+    seconds = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1] if traced else None
+    if traced:
+        tracemalloc.stop()
+
+    return {
+        "pages": server.hits - hits_before,
+        "rows": rows,
+        "db_calls": env.supabase.total_calls,
+        "seconds": seconds,
+        "peak_kib": peak / 1024 if peak is not None else None,
+    }
+
+
+def run(repeat: int) -> dict:
+    pages = recorded_listing(_LISTING_PAGES)
+    server = FixtureServer(pages)
+    records = _listing_records(pages)
+
+    results = {}
+    try:
+        for name, scenario in SCENARIOS.items():
+            runs = [measure(server, records, scenario) for _ in range(repeat)]
+            best = min(runs, key=lambda result: result["seconds"])
+            traced = measure(server, records, scenario, traced=True)
+            results[name] = {
+                "pages": best["pages"],
+                "rows": best["rows"],
+                "db_calls": best["db_calls"],
+                "pages_per_s": round(best["pages"] / best["seconds"], 1),
+                "rows_per_s": round(best["rows"] / best["seconds"], 1),
+                "peak_kib": round(traced["peak_kib"]),
+            }
+    finally:
+        server.close()
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Returns one message per regression against the baseline.
+    """
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+
+        for metric, worse_if_higher in _EXACT_METRICS.items():
+            if result[metric] == expected[metric]:
+                continue
+            if worse_if_higher and result[metric] < expected[metric]:
+                print(f"  {name}: {metric} improved {expected[metric]} -> {result[metric]}, update the baseline")
+                continue
+            regressions.append(f"{name}: {metric} {expected[metric]} -> {result[metric]}")
+
+        for metric in ("pages_per_s", "rows_per_s"):
+            if expected[metric] and result[metric] < expected[metric] * (1 - tolerance):
+                regressions.append(f"{name}: {metric} {expected[metric]} -> {result[metric]}")
+        if result["peak_kib"] > expected["peak_kib"] * (1 + tolerance):
+            regressions.append(f"{name}: peak_kib {expected['peak_kib']} -> {result['peak_kib']}")
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per scenario, the fastest is kept")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="Allowed relative drop in throughput or growth in peak memory")
+    parser.add_argument("--baseline", type=Path, default=_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true", help="Write the results as the new baseline")
+    args = parser.parse_args()
+
+    # Logs, checkpoints and watermarks of the runs stay out of the working tree
+    os.chdir(tempfile.mkdtemp(prefix="bench_pipeline_"))
+
+    results = run(args.repeat)
+
+    print(f"{'scenario':<10} {'pages':>6} {'rows':>6} {'DB calls':>9} {'pages/s':>9} {'rows/s':>10} {'peak KiB':>9}")
+    for name, result in results.items():
+        print(f"{name:<10} {result['pages']:>6} {result['rows']:>6} {result['db_calls']:>9} "
+              f"{result['pages_per_s']:>9.1f} {result['rows_per_s']:>10.1f} {result['peak_kib']:>9}")
+
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}, run with --update-baseline to create one")
+        return
+
+    regressions = compare(results, json.loads(args.baseline.read_text()), args.tolerance)
+    if regressions:
+        print("Regressions against the baseline:")
+        for message in regressions:
+            print(f"  {message}")
+        raise SystemExit(1)
+    print("No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+"""
+Local stand-ins for the three services the scrapers talk to, so the pipeline can be
+measured without SahamIDX, Supabase or Yahoo Finance:
+
+- FixtureServer serves /deviden/page/{page} from the recorded listing page
+- FakeSupabase is an in-memory copy of the Supabase client surface the checkers use
+- StubPriceSource returns fixed yearly close prices
+"""
+from collections import Counter
+from datetime    import datetime, timedelta
+from functools   import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib     import Path
+
+import re
+import threading
+
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+
+_SITE_DATE = re.compile(r"\b\d{2}-[A-Z][a-z]{2}-\d{4}\b")
+_SITE_DATE_FORMAT = "%d-%b-%Y"
+_EX_DATE = re.compile(r'data-header="Ex Date">\s*(\d{2}-[A-Z][a-z]{2}-\d{4})')
+
+
+def recorded_listing(n_pages: int, template: Path = FIXTURES_DIR / "deviden_page.html") -> list[bytes]:
+    """
+    Builds an n_pages listing from the recorded page: page k is the recording with every date moved
+    back by (k - 1) times the span of ex-dates on the page, so the listing stays sorted by ex-date
+    descending like the site and each page keeps the real markup.
+
+    Args:
+        n_pages (int): Number of pages holding dividend rows.
+        template (Path): Recorded /deviden/page/{page} body. Default is fixtures/deviden_page.html
+    """
+    html = template.read_text(encoding="utf-8")
+    dates = [datetime.strptime(value, _SITE_DATE_FORMAT) for value in _EX_DATE.findall(html)]
+    span = timedelta(days=(max(dates) - min(dates)).days + 1)
+
+    def shift(match, offset):
+        return (datetime.strptime(match.group(0), _SITE_DATE_FORMAT) - offset).strftime(_SITE_DATE_FORMAT)
+
+    return [_SITE_DATE.sub(partial(shift, offset=span * page), html).encode("utf-8") for page in range(n_pages)]
+
+
+def empty_page(template: Path = FIXTURES_DIR / "deviden_page.html") -> bytes:
+    """
+    The recorded page with its dividend rows removed, as served past the last page.
+    """
+    html = template.read_text(encoding="utf-8")
+    return re.sub(r"<tbody>\s*<tr>\s*<td data-header=\"No\">.*?</tbody>", "<tbody></tbody>", html, flags=re.S).encode("utf-8")
+
+
+class FixtureServer:
+    def __init__(self, pages: list[bytes]):
+        """
+        Serves the listing pages on 127.0.0.1 with keep-alive, like the SahamIDX front end.
+        Pages past the listing return the page without rows. Requests are counted in `hits`.
+
+        Args:
+            pages (list[bytes]): Page bodies, page 1 first.
+        """
+        self.pages = pages
+        self.empty = empty_page()
+        self.hits = 0
+        self._lock = threading.Lock()
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+        self.url_template = f"http://127.0.0.1:{self._httpd.server_address[1]}/?/deviden/page/{{page}}"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                with server._lock:
+                    server.hits += 1
+                page = int(self.path.rstrip("/").rsplit("/", 1)[-1])
+                body = server.pages[page - 1] if 1 <= page <= len(server.pages) else server.empty
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def close(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+class _Result:
+    def __init__(self, data: list[dict], count: int | None = None):
+        self.data = data
+        self.count = count
+
+
+def _split_top_level(expression: str) -> list[str]:
+    parts, depth, current = [], 0, ""
+    for char in expression:
+        if char == "," and depth == 0:
+            parts.append(current)
+            current = ""
+            continue
+        depth += (char == "(") - (char == ")")
+        current += char
+    return parts + [current]
+
+
+_OPERATORS = {
+    "eq": lambda value, operand: value == operand,
+    "neq": lambda value, operand: value != operand,
+    "gt": lambda value, operand: value is not None and value > operand,
+    "gte": lambda value, operand: value is not None and value >= operand,
+    "lt": lambda value, operand: value is not None and value < operand,
+    "lte": lambda value, operand: value is not None and value <= operand,
+}
+
+
+def _parse_or(expression: str):
+    """
+    Turns a PostgREST or=(...) filter such as 'date.gt.X,and(date.eq.X,symbol.gt."Y")' into a predicate.
+    """
+    def parse_term(term: str):
+        term = term.strip()
+        for group, combine in (("and(", all), ("or(", any)):
+            if term.startswith(group):
+                predicates = [parse_term(part) for part in _split_top_level(term[len(group):-1])]
+                return lambda row: combine(predicate(row) for predicate in predicates)
+        column, operator, operand = term.split(".", 2)
+        operand = operand.strip('"')
+        return lambda row: _OPERATORS[operator](row.get(column), operand)
+
+    predicates = [parse_term(part) for part in _split_top_level(expression)]
+    return lambda row: any(predicate(row) for predicate in predicates)
+
+
+class _Query:
+    def __init__(self, client: "FakeSupabase", table: str):
+        self.client = client
+        self.table = table
+        self.operation = "select"
+        self.payload = None
+        self.columns = "*"
+        self.count = None
+        self.filters = []
+        self.orders = []
+        self.window = None
+        self.on_conflict = None
+
+    def select(self, columns: str = "*", count: str | None = None):
+        self.columns, self.count = columns, count
+        return self
+
+    def insert(self, rows):
+        self.operation, self.payload = "insert", rows
+        return self
+
+    def upsert(self, rows, on_conflict: str | None = None, **kwargs):
+        self.operation, self.payload, self.on_conflict = "upsert", rows, on_conflict
+        return self
+
+    def update(self, values: dict):
+        self.operation, self.payload = "update", values
+        return self
+
+    def delete(self):
+        self.operation = "delete"
+        return self
+
+    def _filter(self, operator: str, column: str, operand):
+        self.filters.append(lambda row: _OPERATORS[operator](row.get(column), operand))
+        return self
+
+    def eq(self, column, operand):
+        return self._filter("eq", column, operand)
+
+    def neq(self, column, operand):
+        return self._filter("neq", column, operand)
+
+    def gt(self, column, operand):
+        return self._filter("gt", column, operand)
+
+    def gte(self, column, operand):
+        return self._filter("gte", column, operand)
+
+    def lt(self, column, operand):
+        return self._filter("lt", column, operand)
+
+    def lte(self, column, operand):
+        return self._filter("lte", column, operand)
+
+    def is_(self, column, operand):
+        self.filters.append(lambda row: (row.get(column) is None) == (operand == "null"))
+        return self
+
+    def in_(self, column, operands):
+        operands = set(operands)
+        self.filters.append(lambda row: row.get(column) in operands)
+        return self
+
+    def or_(self, expression: str):
+        self.filters.append(_parse_or(expression))
+        return self
+
+    def order(self, column: str, desc: bool = False, **kwargs):
+        self.orders.append((column, desc))
+        return self
+
+    def range(self, start: int, end: int):
+        self.window = (start, end)
+        return self
+
+    def limit(self, size: int):
+        self.window = (0, size - 1)
+        return self
+
+    def _matches(self, row: dict) -> bool:
+        return all(predicate(row) for predicate in self.filters)
+
+    def execute(self) -> _Result:
+        client = self.client
+        client.calls[(self.table, self.operation)] += 1
+        rows = client.tables.setdefault(self.table, [])
+
+        if self.operation == "select":
+            selected = [row for row in rows if self._matches(row)]
+            for column, desc in reversed(self.orders):
+                selected.sort(key=lambda row: (row.get(column) is None, row.get(column)), reverse=desc)
+            total = len(selected)
+            start, end = self.window or (0, client.max_rows - 1)
+            selected = selected[start:min(end, start + client.max_rows - 1) + 1]
+            if self.columns != "*":
+                columns = [column.strip() for column in self.columns.split(",")]
+                selected = [{column: row.get(column) for column in columns} for row in selected]
+            return _Result([dict(row) for row in selected], total if self.count else None)
+
+        payload = self.payload if isinstance(self.payload, list) else [self.payload]
+
+        if self.operation == "insert":
+            rows.extend(dict(row) for row in payload)
+            return _Result(payload)
+
+        if self.operation == "upsert":
+            key = tuple(self.on_conflict.split(",")) if self.on_conflict else client.primary_keys[self.table]
+            index = {tuple(row.get(column) for column in key): row for row in rows}
+            for record in payload:
+                existing = index.get(tuple(record.get(column) for column in key))
+                if existing is None:
+                    rows.append(dict(record))
+                    index[tuple(record.get(column) for column in key)] = rows[-1]
+                else:
+                    existing.update(record)
+            return _Result(payload)
+
+        if self.operation == "update":
+            updated = [row for row in rows if self._matches(row)]
+            for row in updated:
+                row.update(self.payload)
+            return _Result([dict(row) for row in updated])
+
+        kept = [row for row in rows if not self._matches(row)]
+        deleted = [row for row in rows if self._matches(row)]
+        rows[:] = kept
+        return _Result(deleted)
+
+
+class FakeSupabase:
+    def __init__(self, tables: dict[str, list[dict]] | None = None, max_rows: int = 1000):
+        """
+        In-memory Supabase client: from_/table, select with the filters, ordering and ranges the
+        checkers use, insert, upsert on the table's primary key, update and delete.
+
+        Every executed request is counted in `calls`, keyed on (table, operation).
+
+        Args:
+            tables (dict[str, list[dict]] | None): Initial rows per table.
+            max_rows (int): Row cap of a single select response, as PostgREST applies. Default is 1000
+        """
+        self.tables = {name: [dict(row) for row in rows] for name, rows in (tables or {}).items()}
+        self.max_rows = max_rows
+        self.calls: Counter = Counter()
+        self.primary_keys = {
+            "idx_dividend": ("symbol", "date"),
+            "idx_upcoming_dividend": ("symbol", "ex_date"),
+            "idx_company_profile": ("symbol",),
+        }
+
+    def from_(self, table: str) -> _Query:
+        return _Query(self, table)
+
+    table = from_
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+
+class StubPriceSource:
+    def __init__(self):
+        """
+        Deterministic stand-in for YahooPriceSource: every ticker has a fixed mean close over 240 days.
+        """
+        self.calls = 0
+
+    def yearly_mean_close(self, tickers: list[str], year: int) -> dict[str, tuple[float, int]]:
+        self.calls += 1
+        return {ticker: (100.0 + sum(map(ord, ticker)) % 900 + year % 10, 240) for ticker in set(tickers)}
@@ -0,0 +1,53 @@
+from pathlib import Path
+
+import json
+import logging
+import os
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+class CrawlCheckpoint:
+    def __init__(self, path: str | Path, run_key: dict):
+        """
+        JSON file recording the last completed page of a crawl and the records gathered so far.
+
+        A checkpoint is only resumed by a crawl with the same run_key (e.g. the same date
+        window), so a stale file from another window is ignored and overwritten.
+
+        Args:
+            path (str | Path): Checkpoint file location.
+            run_key (dict): JSON-serialisable identity of the crawl.
+        """
+        self.path = Path(path)
+        self.run_key = run_key
+
+    def load(self) -> tuple[int, list[dict]] | None:
+        """
+        Returns (last completed page, records) if a checkpoint for this run exists, else None.
+        """
+        try:
+            state = json.loads(self.path.read_text())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as error:
+            LOGGER.warning(f"Ignoring unreadable checkpoint {self.path}: {error}")
+            return None
+
+        if state.get("run_key") != self.run_key:
+            LOGGER.info(f"Ignoring checkpoint {self.path} written for another run {state.get('run_key')}")
+            return None
+        return state["page"], state["records"]
+
+    def save(self, page: int, records: list[dict]):
+        """
+        Atomically replaces the checkpoint with the given progress.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp_path.write_text(json.dumps({"run_key": self.run_key, "page": page, "records": records}))
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        self.path.unlink(missing_ok=True)
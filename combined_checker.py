@@ -0,0 +1,99 @@
+from contextlib      import closing
+from fetcher         import PageFetcher
+from page_parser     import parse_dividend_page
+from run_metrics     import RunMetrics
+
+from dividend_checker import BackfillDiff, DividendChecker
+
+import logging
+import requests
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+def crawl_once(fetcher: PageFetcher, sinks: list, on_page=None, metrics: RunMetrics | None = None) -> int:
+    """
+    Crawls the SahamIDX listing once and routes every parsed row to each sink.
+
+    A sink is any object with an `accept_row(row) -> bool` method, returning False once
+    the rows are older than what it needs. The crawl stops when no sink needs more pages.
+
+    Args:
+        fetcher (PageFetcher): Fetcher for the listing pages.
+        sinks (list): Sinks fed in order, e.g. DividendChecker, FutureDividendChecker, BackfillDiff.
+        on_page (Callable[[], None] | None): Called after every page, e.g. to flush batched writes.
+        metrics (RunMetrics | None): If given, fetch, parse and filter times and page and row counts go there.
+
+    Returns:
+        int: Number of pages crawled.
+    """
+    metrics = metrics or RunMetrics("crawl_once")
+    active_sinks = list(sinks)
+    crawled_pages = 0
+
+    with closing(fetcher.iter_pages()) as pages:
+        for page, response in metrics.timed(pages, "fetch"):
+            if response.status_code != 200:
+                raise requests.exceptions.HTTPError(f"Error retrieving page {page} from SahamIDX, "
+                                                    f"status code {response.status_code}")
+            crawled_pages += 1
+            with metrics.timer("parse"):
+                parsed_page = parse_dividend_page(response.text)
+            metrics.count("pages")
+            metrics.count("rows", len(parsed_page.rows))
+
+            with metrics.timer("filter"):
+                for row in parsed_page.rows:
+                    active_sinks = [sink for sink in active_sinks if sink.accept_row(row)]
+                    if not active_sinks:
+                        break
+
+            if on_page:
+                on_page()
+
+            if not active_sinks:
+                LOGGER.info(f"All windows covered after page {page}. Stopping scrape")
+                break
+            if not parsed_page.data_rows:
+                LOGGER.info("No more data rows found on this page. Stopping scrape")
+                break
+
+    return crawled_pages
+
+
+def crawl_windows(fetcher: PageFetcher,
+                  checkers: list[DividendChecker],
+                  backfill: BackfillDiff | None = None,
+                  metrics: RunMetrics | None = None) -> int:
+    """
+    Fills the checkers' retrieved_records (and optionally backfills idx_dividend) from a single
+    crawl of the listing. Nothing is upserted; that is left to the checkers' upsert_to_db.
+
+    The crawl is not incremental: every checker gets its whole window, with payment dates.
+
+    Args:
+        fetcher (PageFetcher): Fetcher for the listing pages.
+        checkers (list[DividendChecker]): Checkers whose windows are collected, e.g. a DividendChecker
+            and a FutureDividendChecker.
+        backfill (BackfillDiff | None): If given, also inserts the missing idx_dividend rows it accepts,
+            flushed after every page.
+        metrics (RunMetrics | None): If given, fetch, parse and filter times and page and row counts go there.
+
+    Returns:
+        int: Number of pages crawled.
+    """
+    for checker in checkers:
+        checker.begin_crawl(include_payment_date=True)
+    sinks = [*checkers, backfill] if backfill else list(checkers)
+
+    crawled_pages = crawl_once(fetcher, sinks, on_page=backfill.flush if backfill else None, metrics=metrics)
+    LOGGER.info(f"Crawled {crawled_pages} pages for {len(sinks)} windows")
+
+    for checker in checkers:
+        checker.finish_crawl()
+    if backfill:
+        backfill.flush(force=True)
+        LOGGER.info(f"Backfill inserted {backfill.inserted_count} of {len(backfill.new_records)} new records")
+
+    return crawled_pages
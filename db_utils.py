@@ -0,0 +1,57 @@
+from itertools import islice
+from typing    import TYPE_CHECKING, Callable, Iterable, Iterator
+
+import logging
+import os
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+
+LOGGER = logging.getLogger(__name__)
+
+# PostgREST caps a single response at 1000 rows by default
+DEFAULT_PAGE_SIZE = 1000
+
+
+def create_supabase_client() -> "Client":
+    """
+    Creates the Supabase client from SUPABASE_URL and SUPABASE_KEY (read from .env when present).
+
+    supabase is imported here rather than at module level, so importing the scrapers needs
+    neither credentials nor the client library's import time.
+    """
+    from dotenv   import load_dotenv
+    from supabase import create_client
+
+    load_dotenv()
+    return create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
+
+
+def select_paginated(build_query: Callable, page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[list[dict]]:
+    """
+    Run a select in range-requested pages so results are not truncated by the row cap.
+
+    Yields one list of rows per request (the last one may be empty), so callers can
+    both stream the rows and count the round-trips.
+
+    Args:
+        build_query (Callable): Returns a fresh, ordered select query builder on each call.
+        page_size (int): Rows per request. Default is 1000
+    """
+    start = 0
+    while True:
+        rows = build_query().range(start, start + page_size - 1).execute().data
+        yield rows
+        if len(rows) < page_size:
+            return
+        start += page_size
+
+
+def chunked(items: Iterable, size: int) -> Iterator[list]:
+    """
+    Split items into consecutive lists of at most size elements, consuming iterators lazily.
+    """
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
@@ -1,36 +1,59 @@
-from bs4        import BeautifulSoup
-from dotenv     import load_dotenv
-from supabase   import create_client, Client
-from datetime   import datetime, date
-
+from collections     import deque
+from datetime        import datetime, date
+from contextlib      import closing
+from fetcher         import PageFetcher, ResponseCache
+from page_parser     import DividendRow, parse_dividend_page
+from db_utils        import DEFAULT_PAGE_SIZE, create_supabase_client, select_paginated, chunked
+from price_source    import YahooPriceSource
+from price_cache     import CachedPriceSource
+from checkpoint      import CrawlCheckpoint
+from watermark       import CrawlWatermark, content_hash
+from batch_writer    import MicroBatchWriter
+from page_locator    import PageLocator
+from symbol_universe import SymbolUniverse
+from run_metrics     import RunMetrics
+from record_store    import DIVIDEND_SCHEMA, RecordStore, archive_path
+from pathlib         import Path
+from typing          import TYPE_CHECKING
+
+import atexit
 import logging
 import pandas as pd
 import requests
-import time
-import yfinance as yf
-import numpy as np
-import os
-
 
-load_dotenv()
+if TYPE_CHECKING:
+    from supabase import Client
 
 
-# Setup Logging
 LOGGER = logging.getLogger(__name__)
-LOGGER.setLevel(logging.INFO)
 
-file_handler = logging.FileHandler('scrapper.log')
-file_handler.setLevel(logging.INFO)
+SAHAMIDX_URL = "https://www.new.sahamidx.com/?/deviden/page/{page}"
 
-formatter = logging.Formatter(
-    '%(asctime)s [%(levelname)s] - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
-file_handler.setFormatter(formatter)
+# Columns the yield update reads or writes back
+_YIELD_COLUMNS = ("symbol", "date", "dividend", "dividend_original", "yield", "updated_on")
 
-LOGGER.addHandler(file_handler)
 
-LOGGER.info("Init Global Variable")
+def setup_logging(log_file: str = "scrapper.log", debug_records: bool = False):
+    """
+    Sends the scrapers' logs to log_file. Called by the entry points, never at import.
+
+    Args:
+        log_file (str): File the log records are appended to. Default is scrapper.log
+        debug_records (bool): If True, the sampled per-record DEBUG lines are kept too. Default is False
+    """
+    file_handler = logging.FileHandler(log_file)
+    file_handler.setFormatter(logging.Formatter(
+        '%(asctime)s [%(levelname)s] - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    ))
+
+    root_logger = logging.getLogger()
+    root_logger.setLevel(logging.INFO)
+    root_logger.addHandler(file_handler)
+    if debug_records:
+        LOGGER.setLevel(logging.DEBUG)
+
+    LOGGER.info("Program started")
 
 
 def check_start_year():
@@ -43,345 +66,717 @@ def check_start_year():
 
 
 class DividendChecker:
-    def __init__(self, supabase_client: Client, last_n_day: int = 30):
+    table_name = "idx_dividend"
+    record_schema = DIVIDEND_SCHEMA
+
+    def __init__(self,
+                 supabase_client: "Client",
+                 last_n_day: int = 30,
+                 fetcher: PageFetcher = None,
+                 price_source: CachedPriceSource = None,
+                 allowed_symbols: SymbolUniverse = None,
+                 metrics: RunMetrics = None):
         """ 
         DividendChecker class to scrape dividend data from SahamIDX and manage it in a database.
 
         Args:
             supabase_client (Client): Supabase client instance for database operations.
             last_n_day (int): Number of days to look back for dividend data. Default is 7
+            fetcher (PageFetcher): Page fetcher shared by the crawls. Default builds one for the SahamIDX listing
+                with a one-hour on-disk response cache.
+            price_source (CachedPriceSource): Source of yearly mean close prices for yield calculation.
+                Default is Yahoo Finance behind the on-disk price cache.
+            allowed_symbols (SymbolUniverse): Symbols to keep. Default is idx_company_profile, loaded on first
+                use and cached on disk for a day.
+            metrics (RunMetrics): Stage timers and counters of the run. Default is a fresh RunMetrics named
+                after the class.
         """
-        self.url = "https://www.new.sahamidx.com/?/deviden/page/{page}"
+        self.url = SAHAMIDX_URL
+        self.fetcher = fetcher or PageFetcher(self.url, cache=ResponseCache())
+        self.price_source = price_source or CachedPriceSource(YahooPriceSource())
         self.supabase_client = supabase_client
         self.start_date = (pd.Timestamp.now("Asia/Bangkok") - pd.Timedelta(days=last_n_day - 1)).strftime("%Y-%m-%d")
         self.end_date = pd.Timestamp.now("Asia/Bangkok").strftime("%Y-%m-%d")
         self.retrieved_records: list[dict] = []
-        self.allowed_symbols = [k['symbol'][:4] for k in
-                                self.supabase_client.from_("idx_company_profile").select("symbol").execute().data]
+        # One updated_on stamp shared by every record written during this run
+        self.run_timestamp = pd.Timestamp.now(tz="GMT").strftime("%Y-%m-%d %H:%M:%S")
+        self.db_calls = 0
+        self.checkpoint_path = Path(".cache") / f"{type(self).__name__}_checkpoint.json"
+        self.watermark_path = Path(".cache") / f"{type(self).__name__}_watermark.json"
+        self.watermark: CrawlWatermark | None = None
+        # A universe passed in is shared with other checkers, whose owner reports its DB calls
+        self._owns_symbols = allowed_symbols is None
+        self.allowed_symbols = allowed_symbols or SymbolUniverse(supabase_client)
+        self.metrics = metrics or RunMetrics(type(self).__name__)
+
+    def begin_crawl(self,
+                    include_payment_date: bool = False,
+                    watermark: CrawlWatermark | None = None,
+                    record_sink: list | None = None):
+        """
+        Prepares accept_row for a crawl over this checker's window.
+
+        Args:
+            include_payment_date (bool): If True, rows without a payment date are skipped and the
+                payment date is kept. Default is False.
+            watermark (CrawlWatermark | None): If given, only new or changed records are kept.
+            record_sink (list | None): List accepted records are appended to. Default is retrieved_records.
+        """
+        self.watermark = watermark
+        self._include_payment_date = include_payment_date
+        self._record_sink = self.retrieved_records if record_sink is None else record_sink
+        self._record_keys = {(record["symbol"], record["date"]) for record in self.retrieved_records}
+
+    def accept_row(self, row: DividendRow) -> bool:
+        """
+        Adds a parsed row to retrieved_records if it belongs to the window.
+        Returns False once the rows are older than the window, i.e. this checker needs no more pages.
+        """
+        # Prepare symbol 
+        if row.symbol not in self.allowed_symbols:
+            self.metrics.count("skips")
+            return True
+
+        if row.ex_date < self.start_date:
+            LOGGER.info(f"Stop condition met: Found Ex-Date {row.ex_date} which is older than start date {self.start_date}.")
+            return False
+
+        # Validation for data in a range start_date and end_date
+        if not (self.start_date <= row.ex_date <= self.end_date):
+            self.metrics.count("skips")
+            return True
+
+        if not (row.cum_date and row.recording_date):
+            LOGGER.error(f"Skipping row due to parsing error: missing cum/recording date for {row.symbol} on {row.ex_date}")
+            self.metrics.count("skips")
+            return True
+
+        # Deduplicate on (symbol, date)
+        symbol = row.symbol + '.JK'
+        if (symbol, row.ex_date) in self._record_keys:
+            self.metrics.count("skips")
+            return True
+
+        # Data valid to be upserted
+        data_dict = {
+            "symbol": symbol,
+            "date": row.ex_date,
+            "dividend_original": row.amount,
+            "dividend": row.amount,
+            "recording_date": row.recording_date,
+            "cum_date": row.cum_date,
+            "updated_on": self.run_timestamp,
+        }
+
+        if self._include_payment_date:
+            if not row.payment_date:
+                self.metrics.count("skips")
+                return True
+
+            data_dict["payment_date"] = row.payment_date
+
+        # Marked as seen before the watermark check, so an unchanged record is not replaced by a later duplicate
+        self._record_keys.add((symbol, row.ex_date))
+        if self.watermark and not self.watermark.record_changed(data_dict):
+            self.metrics.count("skips")
+            return True
+
+        if self.metrics.sampled("record"):
+            LOGGER.debug(f'[FETCHING] {data_dict}')
+        self._record_sink.append(data_dict)
+        return True
+
+    def format_record(self, record: dict) -> dict:
+        """
+        Shapes a scraped record for the checker's table. idx_dividend takes it as it is.
+        """
+        return record
+
+    def finish_crawl(self):
+        """
+        Hook run once a crawl over this checker's window is over. Records are kept as they are.
+        """
+
+    def _crawl_pages(self, start_page: int, include_payment_date: bool, watermark: CrawlWatermark | None):
+        """
+        Crawls the listing from start_page and yields (page, records accepted on that page) until
+        the window is covered. Network failures that outlast the fetcher's retries are raised.
+        """
+        page_records = []
+        self.begin_crawl(include_payment_date, watermark, record_sink=page_records)
+        if watermark:
+            watermark.begin_window(self.start_date, self.end_date)
+            if not watermark.same_window:
+                LOGGER.info(f"Window moved since the last run ({watermark.start_date}..{watermark.end_date}), "
+                            f"sending no conditional requests")
+
+        pages = self.fetcher.iter_pages(start_page,
+                                        headers_for_page=watermark.conditional_headers if watermark else None,
+                                        probe_first=watermark is not None)
+        with closing(pages):
+            for page, response in self.metrics.timed(pages, "fetch"):
+                self.metrics.count("pages")
+                if watermark and response.status_code == 304:
+                    LOGGER.info(f"Page {page} not modified since the last run. Stopping scrape")
+                    return
+
+                if response.status_code != 200:
+                    raise requests.exceptions.HTTPError(f"Error retrieving page {page} from SahamIDX, "
+                                                        f"status code {response.status_code}")
+
+                with self.metrics.timer("parse"):
+                    parsed_page = parse_dividend_page(response.text)
+                self._count_rows(parsed_page)
+
+                if watermark:
+                    page_hash = content_hash(parsed_page.rows)
+                    ex_dates = [row.ex_date for row in parsed_page.rows]
+                    if watermark.can_stop(page_hash, ex_dates):
+                        LOGGER.info(f"Page {page} unchanged since the last run. Stopping scrape")
+                        return
+                    watermark.update_page(page, page_hash, response, max(ex_dates, default=None))
 
-    def get_dividend_records(self, include_payment_date: bool = False):
+                with self.metrics.timer("filter"):
+                    keep_scraping = all(self.accept_row(row) for row in parsed_page.rows)
+
+                yield page, list(page_records)
+                page_records.clear()
+
+                if not parsed_page.data_rows:
+                    LOGGER.info("No more data rows found on this page. Stopping scrape")
+                    return
+
+                if not keep_scraping:
+                    return
+
+    def _count_rows(self, parsed_page):
+        self.metrics.count("rows", len(parsed_page.rows))
+        if parsed_page.data_rows > len(parsed_page.rows):
+            self.metrics.count("parse_errors", parsed_page.data_rows - len(parsed_page.rows))
+
+    def get_dividend_records(self, include_payment_date: bool = False, incremental: bool = False):
         """ 
         Scrapes dividend data from SahamIDX and stores it in the retrieved_records list.
 
+        Failing pages are retried individually by the fetcher. Progress is checkpointed after
+        every page, so a crashed or timed-out run over the same window resumes where it stopped.
+
         Args:
             include_payment_date (bool): If True, includes payment date in the retrieved records. Default is False.
+            incremental (bool): If True, sends conditional requests, stops at the first page already seen
+                by the last committed run and only keeps new or changed records. Once the window moved,
+                pages are read until the ex-dates new to the window are covered. Default is False.
         """
-        attempt = 1
-        max_attempt = 10
-        
         LOGGER.info(f'Scrape for start date: {self.start_date} and end date: {self.end_date}')
 
-        while (attempt <= max_attempt):
-            try:
-                page = 1                      
-                keep_scraping = True
-
-                while keep_scraping:
-                    current_url = self.url.format(page=page)
-                    LOGGER.info(f"Fetching page {page}...")
-                    
-                    response = requests.get(current_url)
-                    if response.status_code != 200:
-                        raise Exception("Error retrieving data from SahamIDX")
-
-                    soup = BeautifulSoup(response.text, "lxml")
-                    rows = soup.find_all("tr")
-                    data_found_on_page = False
-
-                    for row in rows:
-                        try:
-                            # Get necessary data cell
-                            symbol = row.find("td", {"data-header": "Nama"})
-                            dividend = row.find("td", {"data-header": "Amount"})
-                            ex_date = row.find("td", {"data-header": "Ex Date"})
-                            payment_date = row.find("td", {"data-header": "Payment Date"})
-                            recording_date = row.find("td", {"data-header": "Recording Date"})
-                            cum_date = row.find("td", {"data-header": "Cum Date"})
-                    
-                            if not (symbol and dividend and ex_date):
-                                continue
-                            
-                            data_found_on_page = True
-
-                            # Prepare symbol 
-                            symbol = symbol.text.strip()
-                            if symbol not in self.allowed_symbols:
-                                continue 
-                            
-                            symbol = symbol + '.JK'
-
-                            # Prepare divident original 
-                            dividend = dividend.text.strip()
-                            dividend = float(dividend) 
-
-                            # Prepare Ex Date 
-                            ex_date_str = ex_date.text.strip()
-                            ex_date = datetime.strptime(ex_date_str, "%d-%b-%Y").strftime("%Y-%m-%d")
-
-                            # Prepare Cum Date 
-                            cum_date_str = cum_date.text.strip()
-                            cum_date = datetime.strptime(cum_date_str, "%d-%b-%Y").strftime("%Y-%m-%d")
-
-                            # Prepare Recording Date 
-                            recording_date_str = recording_date.text.strip()
-                            recording_date = datetime.strptime(recording_date_str, "%d-%b-%Y").strftime("%Y-%m-%d")
-                            
-                            if ex_date < self.start_date:
-                                LOGGER.info(f"Stop condition met: Found Ex-Date {ex_date} which is older than start date {self.start_date}.")
-                                keep_scraping = False
-                                break
-
-                            # Validation for data in a range start_date and end_date
-                            if not (self.start_date <= ex_date <= self.end_date):
-                                continue  
-
-                            # Data valid to be upserted
-                            data_dict = {
-                                "symbol": symbol,
-                                "date": ex_date,
-                                "dividend_original": dividend,
-                                "dividend": dividend,
-                                "recording_date": recording_date,
-                                "cum_date": cum_date,
-                                "updated_on": pd.Timestamp.now(tz="GMT").strftime("%Y-%m-%d %H:%M:%S"),
-                            }
-
-                            if include_payment_date:
-                                if not payment_date:
-                                    continue 
-
-                                payment_date_str = payment_date.text.strip()
-                                payment_date = datetime.strptime(payment_date_str, "%d-%b-%Y").strftime("%Y-%m-%d")
-                            
-                                data_dict["payment_date"] = payment_date
-
-                            LOGGER.info(f'[FETCHING] {data_dict}')
-                            self.retrieved_records.append(data_dict)
-
-                        except (ValueError, TypeError) as error:
-                            LOGGER.error(f"Skipping row due to parsing error: {error}")
-                            continue
-
-                    if not data_found_on_page:
-                        LOGGER.info("No more data rows found on this page. Stopping scrape")
-                        keep_scraping = False
-
-                    time.sleep(1)
-                    page += 1 
+        watermark = CrawlWatermark(self.watermark_path) if incremental else None
+        if watermark:
+            LOGGER.info(f"Incremental scrape, newest ex-date seen so far: {watermark.newest_ex_date}")
+
+        checkpoint = CrawlCheckpoint(self.checkpoint_path, run_key={
+            "start_date": self.start_date,
+            "end_date": self.end_date,
+            "include_payment_date": include_payment_date,
+            "incremental": incremental,
+        })
+        start_page = 1
+        saved_state = checkpoint.load()
+        if saved_state:
+            last_page, saved_records = saved_state
+            start_page = last_page + 1
+            self.retrieved_records.extend(saved_records)
+            LOGGER.info(f"Resuming from page {start_page} with {len(saved_records)} checkpointed records")
 
-                break
+        try:
+            for page, page_records in self._crawl_pages(start_page, include_payment_date, watermark):
+                self.retrieved_records.extend(page_records)
+                checkpoint.save(page, self.retrieved_records)
+
+            checkpoint.clear()
+
+        except requests.exceptions.RequestException as error:
+            LOGGER.error(f"\t[ATTEMPTS FAILED] Page retries exhausted, progress kept in {checkpoint.path} | {error}")
 
+        self.finish_crawl()
+
+    def iter_dividend_records(self, include_payment_date: bool = False, incremental: bool = False):
+        """
+        Streams the scraped records page by page, in the shape of the checker's table,
+        without keeping them in retrieved_records.
+
+        Args:
+            include_payment_date (bool): If True, includes payment date in the records. Default is False.
+            incremental (bool): If True, only new or changed records are yielded (see get_dividend_records).
+                The watermark is committed by the caller through commit_watermark(). Default is False.
+        """
+        LOGGER.info(f'Stream scrape for start date: {self.start_date} and end date: {self.end_date}')
+
+        watermark = CrawlWatermark(self.watermark_path) if incremental else None
+        for _, page_records in self._crawl_pages(1, include_payment_date, watermark):
+            for record in page_records:
+                yield self.format_record(record)
+
+    def upsert_stream(self,
+                      include_payment_date: bool = False,
+                      incremental: bool = False,
+                      batch_size: int = 200,
+                      flush_interval: float = 5.0,
+                      max_in_flight: int = 2) -> int:
+        """
+        Scrapes and upserts at the same time: records are written in micro-batches on background
+        threads while the next pages are fetched and parsed. Returns the number of records written.
+
+        Records are not kept once written, so memory stays bounded by the batches in flight and
+        archive_run() has nothing to archive afterwards. The last page whose records were all
+        acknowledged by the database is checkpointed, so a crashed or timed-out run over the same
+        window resumes after it.
+
+        Args:
+            include_payment_date (bool): If True, includes payment date in the records. Default is False.
+            incremental (bool): If True, only new or changed records are written. Default is False.
+            batch_size (int): Records per upsert request. Default is 200
+            flush_interval (float): Maximum seconds a scraped record waits for its batch. Default is 5.0
+            max_in_flight (int): Maximum number of upsert requests running at once. Default is 2
+        """
+        LOGGER.info(f'Stream scrape for start date: {self.start_date} and end date: {self.end_date}')
+
+        watermark = CrawlWatermark(self.watermark_path) if incremental else None
+        checkpoint = CrawlCheckpoint(self.checkpoint_path, run_key={
+            "start_date": self.start_date,
+            "end_date": self.end_date,
+            "include_payment_date": include_payment_date,
+            "incremental": incremental,
+            "stream": True,
+        })
+        start_page = 1
+        saved_state = checkpoint.load()
+        if saved_state:
+            start_page = saved_state[0] + 1
+            LOGGER.info(f"Resuming stream from page {start_page}, earlier pages are already upserted")
+
+        writer = MicroBatchWriter(self._upsert_batch,
+                                  batch_size=batch_size,
+                                  flush_interval=flush_interval,
+                                  max_in_flight=max_in_flight)
+        # (page, number of records added once the page was read), for pages not acknowledged yet
+        page_ends = deque()
+        acknowledged_page = None
+
+        def save_progress():
+            nonlocal acknowledged_page
+            last_page = acknowledged_page
+            while page_ends and page_ends[0][1] <= writer.acknowledged:
+                acknowledged_page = page_ends.popleft()[0]
+            if acknowledged_page != last_page:
+                checkpoint.save(acknowledged_page, [])
+
+        try:
+            with writer:
+                for page, page_records in self._crawl_pages(start_page, include_payment_date, watermark):
+                    for record in page_records:
+                        writer.add(self.format_record(record))
+                    page_ends.append((page, writer.added))
+                    save_progress()
+        except Exception:
+            save_progress()
+            LOGGER.error(f"Stream interrupted, progress kept in {checkpoint.path}")
+            raise
+
+        checkpoint.clear()
+        self.commit_watermark()
+        LOGGER.info(f"Successfully upserted {writer.written} data to {self.table_name} in {writer.batches} batches")
+        return writer.written
+
+    def _upsert_batch(self, records: list[dict]):
+        with self.metrics.timer("db_write"):
+            self.supabase_client.table(self.table_name).upsert(records).execute()
+        self.db_calls += 1
+
+    def _load_existing_keys(self, db_table_name: str, start_date: str, end_date: str) -> set[tuple[str, str]]:
+        """
+        Loads the (symbol, date) keys already stored between start_date and end_date, in paginated bulk.
+        """
+        existing_keys = set()
+
+        def build_query():
+            return self.supabase_client.from_(db_table_name) \
+                       .select("symbol,date") \
+                       .gte("date", start_date) \
+                       .lte("date", end_date) \
+                       .order("date") \
+                       .order("symbol")
+
+        for rows in self.metrics.timed(select_paginated(build_query), "db_read"):
+            self.db_calls += 1
+            existing_keys.update((row["symbol"], row["date"]) for row in rows)
+
+        return existing_keys
+
+    def _insert_in_chunks(self, db_table_name: str, records: list[dict], chunk_size: int) -> int:
+        """
+        Inserts records in chunks of chunk_size, logging failures per chunk. Returns the number of rows inserted.
+        """
+        inserted = 0
+        for index, chunk in enumerate(chunked(records, chunk_size), start=1):
+            self.db_calls += 1
+            try:
+                with self.metrics.timer("db_write"):
+                    self.supabase_client.from_(db_table_name).insert(chunk).execute()
+                inserted += len(chunk)
             except Exception as error:
-                if (attempt == max_attempt):
-                    LOGGER.error(f"\t[ATTEMPTS FAILED] Failed after {max_attempt} attempts. | {error}")
-                else:
-                    LOGGER.error(f"\t[FAILED] Failed after {attempt} attempt(s). Retrying after 2 seconds... | {error}")
-                    time.sleep(2)
-                attempt += 1
+                LOGGER.error(f"Error inserting chunk {index} ({len(chunk)} rows, "
+                             f"{chunk[0]['symbol']} {chunk[0]['date']} .. {chunk[-1]['symbol']} {chunk[-1]['date']}): {error}")
+        return inserted
 
     def check_fill_missing_dividend(self, 
                                     is_saved: bool= True,
                                     cutoff_date: str = "2025-10-08", 
-                                    db_table_name: str = "idx_dividend"):
+                                    db_table_name: str = "idx_dividend",
+                                    insert_chunk_size: int = 500):
         """
         Scrapes all dividends from SahamIDX and inserts any that are missing from the database.
         Stops when it encounters a dividend date older than the cutoff_date.
 
         Args:
-            is_saved (bool): If True, saves newly inserted records to a CSV file. Default is True.
+            is_saved (bool): If True, archives the newly inserted records as Parquet under
+                records/archive/idx_dividend_backfill. Default is True.
             cutoff_date (str): The date in "YYYY-MM-DD" format to stop scraping when
                 a dividend date older than this is found. Default is "2020-01-01".
             db_table_name (str): The name of the database table to check for existing records.
+            insert_chunk_size (int): Number of missing records sent per insert request. Default is 500
         """
         page = 1
         keep_scraping = True
-        newly_inserted_records = []
-        
-        # Convert the string cutoff_date to a datetime object for comparison
-        cutoff_dt = datetime.strptime(cutoff_date, "%Y-%m-%d")
+        db_calls_before = self.db_calls
+        backfill = BackfillDiff(self, cutoff_date, db_table_name, insert_chunk_size)
         
-        while keep_scraping:
-            current_url = self.url.format(page=page)
-            LOGGER.info(f"Processing page {page}...")
+        with closing(self.fetcher.iter_pages()) as pages:
+            while keep_scraping:
+                LOGGER.info(f"Processing page {page}...")
 
-            try:
-                response = requests.get(current_url, timeout=15)
-                if response.status_code != 200:
-                    LOGGER.info(f"Error fetching page {page}, status code {response.status_code}. Stopping.")
+                try:
+                    with self.metrics.timer("fetch"):
+                        _, response = next(pages)
+                    self.metrics.count("pages")
+                    if response.status_code != 200:
+                        LOGGER.info(f"Error fetching page {page}, status code {response.status_code}. Stopping.")
+                        break
+                except requests.exceptions.RequestException as e:
+                    LOGGER.error(f"Network error on page {page}: {e}. Stopping.")
                     break
-            except requests.exceptions.RequestException as e:
-                LOGGER.error(f"Network error on page {page}: {e}. Stopping.")
-                break
 
-            soup = BeautifulSoup(response.text, "lxml")
-            
-            rows = soup.find_all("tr")
-            data_found_on_page = False
+                with self.metrics.timer("parse"):
+                    parsed_page = parse_dividend_page(response.text)
+                self._count_rows(parsed_page)
 
-            for row in rows:
-                try:
-                    symbol_cell = row.find("td", {"data-header": "Nama"})
-                    dividend_cell = row.find("td", {"data-header": "Amount"})
-                    ex_date_cell = row.find("td", {"data-header": "Ex Date"})
-
-                    if not (symbol_cell and dividend_cell and ex_date_cell):
-                        continue
-                        
-                    data_found_on_page = True
-
-                    # Get date
-                    ex_date_str = ex_date_cell.text.strip()
-                    date_from_site_dt = datetime.strptime(ex_date_str, "%d-%b-%Y")
-
-                    # Stop check using the cutoff date 
-                    if date_from_site_dt < cutoff_dt:
-                        LOGGER.info(f"Stop condition met: Found date {date_from_site_dt.strftime('%Y-%m-%d')} which is older than cutoff {cutoff_date}.")
-                        keep_scraping = False
-                        break
-                    
-                    # Get symbol (Using your confirmed simple logic)
-                    symbol = symbol_cell.text.strip()
-                    if symbol not in self.allowed_symbols:
-                        continue
-
-                    # Adjust the symbol
-                    adjusted_symbol = f"{symbol}.JK"
-
-                    # Format the date to "YYYY-MM-DD"
-                    date_str = date_from_site_dt.strftime("%Y-%m-%d")
-
-                    # Get dividend
-                    dividend_str = dividend_cell.text.strip()
-                    dividend_original = float(dividend_str)
-
-                    # Check Supabase data if a record with this key (symbol, date) already exists
-                    count_res = self.supabase_client.from_(db_table_name) \
-                                    .select('symbol', count='exact') \
-                                    .eq("symbol", adjusted_symbol) \
-                                    .eq("date", date_str) \
-                                    .execute()
-                    
-                    # Check if the count is zero, meaning no existing record
-                    if count_res.count == 0: 
-                        # New record to insert
-                        if date_str <= self.end_date:
-                            LOGGER.info(f"New record found: {symbol} on {date_str}. Inserting")
-
-                            data_dict = {
-                                "symbol": adjusted_symbol,
-                                "date": date_str,
-                                "dividend_original": dividend_original,
-                                "dividend": dividend_original, 
-                                "updated_on": pd.Timestamp.now(tz="GMT").strftime("%Y-%m-%d %H:%M:%S"),
-                            }
-
-                            # Insert into the database
-                            try:
-                                self.supabase_client.from_(db_table_name).insert(data_dict).execute()
-                            except Exception as error:
-                                LOGGER.error(f"Error inserting new data {error}")
-
-                            newly_inserted_records.append(data_dict)
-                    else:
-                        pass 
-            
-                except (ValueError, IndexError) as error:
-                    LOGGER.warning(f"Skipping a row due to parsing error: {error}")
-                    continue
+                with self.metrics.timer("filter"):
+                    for row in parsed_page.rows:
+                        if not backfill.accept_row(row):
+                            keep_scraping = False
+                            break
+
+                backfill.flush()
             
-            if not data_found_on_page:
-                LOGGER.info("Reached the last page with data. Process complete.")
-                keep_scraping = False
+                if not parsed_page.data_rows:
+                    LOGGER.info("Reached the last page with data. Process complete.")
+                    keep_scraping = False
 
-            if not keep_scraping:
-                break
-                
-            page += 1
-            time.sleep(2) 
+                if not keep_scraping:
+                    break
+
+                page += 1
+
+        backfill.flush(force=True)
         
-        # Saved to csv
-        if is_saved and newly_inserted_records:
-            LOGGER.info('Saved as csv to check')
-            df = pd.DataFrame(newly_inserted_records)
-            df.to_csv("new_data_to_insert_continue.csv", index=False)
+        if is_saved and backfill.new_records:
+            self._write_archive(backfill.new_records, archive_path(f"{db_table_name}_backfill"))
+
+        LOGGER.info(f"\nBackfill complete. Inserted {backfill.inserted_count} of {len(backfill.new_records)} new records "
+                    f"using {self.db_calls - db_calls_before} DB calls.")
+
+    def backfill_window(self,
+                        start_date: str,
+                        end_date: str,
+                        shards: int = 4,
+                        db_table_name: str = "idx_dividend",
+                        insert_chunk_size: int = 500) -> int:
+        """
+        Inserts the dividends missing from the database for an arbitrary historical window.
+
+        Instead of walking the listing from page 1, the pages covering the window are located by
+        bisection on their ex-dates, then fetched in parallel shards. Returns the number of rows inserted.
+
+        Args:
+            start_date (str): Oldest ex-date to backfill, "YYYY-MM-DD".
+            end_date (str): Newest ex-date to backfill, "YYYY-MM-DD".
+            shards (int): Number of pages fetched in parallel. Default is 4
+            db_table_name (str): The name of the database table to check for existing records.
+            insert_chunk_size (int): Number of missing records sent per insert request. Default is 500
+        """
+        db_calls_before = self.db_calls
+        locator = PageLocator(self.fetcher)
+        pages = locator.locate(start_date, end_date)
+        backfill = BackfillDiff(self, start_date, db_table_name, insert_chunk_size, end_date=end_date)
+
+        for row in locator.iter_rows(pages, shards=shards):
+            if not backfill.accept_row(row):
+                break
+        backfill.flush(force=True)
 
-        LOGGER.info(f"\nBackfill complete. Inserted {len(newly_inserted_records)} new records.")
+        LOGGER.info(f"Backfill of {start_date}..{end_date} complete. Inserted {backfill.inserted_count} of "
+                    f"{len(backfill.new_records)} new records from {len(pages)} pages, using {locator.probes} "
+                    f"page probes and {self.db_calls - db_calls_before} DB calls.")
+        return backfill.inserted_count
+
+    def commit_watermark(self):
+        """
+        Persists the incremental scrape watermark, once its records are safely in the database.
+        """
+        if self.watermark is not None:
+            self.watermark.prune(self.start_date)
+            self.watermark.save()
+
+    def _write_archive(self, records: RecordStore, root: Path) -> Path | None:
+        try:
+            path = records.write_parquet(root, run_date=self.run_timestamp[:10])
+        except ImportError:
+            LOGGER.warning(f"pyarrow is not installed, {len(records)} records not archived to {root}")
+            return None
+        LOGGER.info(f"Archived {len(records)} records to {path}")
+        return path
+
+    def archive_run(self) -> Path | None:
+        """
+        Writes the records upserted during this run to records/archive/<table_name> as Parquet,
+        partitioned by run date. Returns the partition written, if any.
+
+        The records are packed into a RecordStore only here, for the archive. The directory is
+        git-ignored; the scheduled workflow uploads it as an artifact.
+        """
+        if not self.retrieved_records:
+            return None
+        records = RecordStore(self.record_schema)
+        records.extend(self.retrieved_records)
+        return self._write_archive(records, archive_path(self.table_name))
+
+    def write_run_report(self):
+        """
+        Writes the run's stage timings and counters to the metrics report (see RunMetrics).
+        The symbol universe's DB calls are only counted when this checker built it.
+        """
+        symbol_calls = getattr(self.allowed_symbols, "db_calls", 0) if self._owns_symbols else 0
+        self.metrics.counters["db_calls"] = self.db_calls + symbol_calls
+        self.metrics.counters["retries"] = self.fetcher.retries
+        path = self.metrics.write_report(start_date=self.start_date, end_date=self.end_date)
+        LOGGER.info(f"Run report written to {path}: {self.metrics.report()}")
 
     def upsert_to_db(self):
         """
         Upserts the retrieved dividend records to the database.
         """
         if not self.retrieved_records:
+            self.commit_watermark()
             LOGGER.warning("No records to upsert to database. All data is up to date")
             raise SystemExit(0)
 
         try:
-            self.supabase_client.table("idx_dividend").upsert(
-                self.retrieved_records
-            ).execute()
+            with self.metrics.timer("db_write"):
+                self.supabase_client.table(self.table_name).upsert(
+                    self.retrieved_records
+                ).execute()
+            self.db_calls += 1
             LOGGER.info(
                 f"Successfully upserted {len(self.retrieved_records)} data to database"
             )
         except Exception as error:
             raise Exception(f"Error upserting to database: {error}")
 
-    def upsert_yield_in_db(self):
-        """
-        Calculates the yield for each dividend record in the database where the yield is missing,
-        and updates the database with the calculated yield values.
+        self.commit_watermark()
+
+    def iter_missing_yield_rows(self, before_year: int, page_size: int = DEFAULT_PAGE_SIZE):
         """
-        database_data = supabase_client.from_("idx_dividend").select("*").execute().data
-        db_df = pd.DataFrame(database_data)
+        Streams the idx_dividend rows without a yield and dated before before_year.
 
-        count = 0
-        for index, row in db_df.iterrows():
-            if pd.isna(row['yield']):
-                ticker = row['symbol']
-                dividend_date = row['date']
-                dividend_year = int(dividend_date.split("-")[0])
-                current_year = datetime.now().year
-
-                if (dividend_year < current_year):
-                    # If starting from that year
-                    start_date = f"{dividend_year}-01-01"
-                    end_date = f"{dividend_year}-12-31"
-                    count += 1
-
-                    stock = yf.Ticker(ticker).history(start=start_date, end=end_date, auto_adjust=False)
-                    stock = stock[["Close"]]  # Get only the Close data
-                    mean_val = stock.mean().values[0]
-                    yield_val = row['dividend'] / mean_val
-                    db_df.at[index, 'yield'] = yield_val
-                    db_df.at[index, 'updated_on'] = pd.Timestamp.now(tz="GMT").strftime("%Y-%m-%d %H:%M:%S")
-                    LOGGER.info(f"[UPDATING YIELD] {ticker} {dividend_date} yield : {yield_val}")
-
-        db_df = db_df.replace({np.nan: None})
-
-        # Upsert to db the result
+        Filtering and column selection happen server side. Pages are requested by keyset
+        on (date, symbol) rather than by offset, so rows updated by the caller while the
+        generator is open cannot shift later pages.
+
+        Args:
+            before_year (int): Only rows dated before January 1st of this year are returned.
+            page_size (int): Rows per request. Default is 1000
+        """
+        last_key = None
+        while True:
+            query = self.supabase_client.from_("idx_dividend") \
+                        .select(",".join(_YIELD_COLUMNS)) \
+                        .is_("yield", "null") \
+                        .lt("date", f"{before_year}-01-01")
+            if last_key:
+                last_date, last_symbol = last_key
+                query = query.or_(f'date.gt.{last_date},and(date.eq.{last_date},symbol.gt."{last_symbol}")')
+
+            with self.metrics.timer("db_read"):
+                rows = query.order("date").order("symbol").limit(page_size).execute().data
+            self.db_calls += 1
+            yield from rows
+
+            if len(rows) < page_size:
+                return
+            last_key = (rows[-1]["date"], rows[-1]["symbol"])
+
+    def _update_yield_batch(self, rows: list[dict]) -> int:
+        """
+        Computes and upserts the yield for a batch of rows missing it. Returns the number of rows updated.
+        """
+        # numpy is only needed here, by the yearly yield update
+        import numpy as np
+
+        missing_df = pd.DataFrame(rows)
+        missing_df["year"] = missing_df["date"].str[:4].astype(int)
+
+        # One price lookup per (ticker, year), batched across tickers of the same year
+        price_rows = []
+        for year, year_df in missing_df.groupby("year"):
+            with self.metrics.timer("prices"):
+                mean_close = self.price_source.yearly_mean_close(year_df["symbol"].unique().tolist(), year)
+            price_rows.extend((symbol, year, mean_val) for symbol, (mean_val, _) in mean_close.items())
+        price_df = pd.DataFrame(price_rows, columns=["symbol", "year", "mean_close"])
+
+        updated_df = missing_df.drop(columns="yield").merge(price_df, on=["symbol", "year"], how="inner")
+        updated_df["yield"] = updated_df["dividend"] / updated_df["mean_close"]
+        updated_df = updated_df[np.isfinite(updated_df["yield"])]
+        if updated_df.empty:
+            LOGGER.warning(f"No price data found for {len(missing_df)} dividend rows missing yield")
+            return 0
+
+        updated_df["updated_on"] = self.run_timestamp
+        updated_records = updated_df[list(_YIELD_COLUMNS)].replace({np.nan: None}).to_dict(orient="records")
+        LOGGER.info(f"[UPDATING YIELD] {len(updated_records)} rows across {len(price_df)} ticker-years")
+
+        # Upsert only the rows whose yield changed
         try:
-            self.supabase_client.table("idx_dividend").upsert(
-                db_df.to_dict(orient="records")
-            ).execute()
-            LOGGER.info(
-                f"Successfully updated {count} yield data in database"
-            )
+            for chunk in chunked(updated_records, 500):
+                with self.metrics.timer("db_write"):
+                    self.supabase_client.table("idx_dividend").upsert(chunk).execute()
+                self.db_calls += 1
         except Exception as e:
             raise Exception(f"Error upserting to database: {e}")
 
+        return len(updated_records)
+
+    def upsert_yield_in_db(self, batch_rows: int = 5000):
+        """
+        Calculates the yield for each dividend record in the database where the yield is missing,
+        and updates the database with the calculated yield values.
+
+        Args:
+            batch_rows (int): Number of streamed rows processed and written at a time. Default is 5000
+        """
+        count = 0
+        for rows in chunked(self.iter_missing_yield_rows(datetime.now().year), batch_rows):
+            count += self._update_yield_batch(rows)
+
+        LOGGER.info(
+            f"Successfully updated {count} yield data in database"
+        )
+
 
+class BackfillDiff:
+    def __init__(self,
+                 checker: DividendChecker,
+                 cutoff_date: str = "2025-10-08",
+                 db_table_name: str = "idx_dividend",
+                 insert_chunk_size: int = 500,
+                 end_date: str | None = None):
+        """
+        Diffs scraped rows against the database and inserts the missing ones in chunks.
+
+        The existing (symbol, date) keys between cutoff_date and end_date are loaded once, up front.
+
+        Args:
+            checker (DividendChecker): Checker providing the database client, symbol universe and end_date.
+            cutoff_date (str): The date in "YYYY-MM-DD" format before which rows are not backfilled.
+            db_table_name (str): The name of the database table to check for existing records.
+            insert_chunk_size (int): Number of missing records sent per insert request. Default is 500
+            end_date (str | None): Newest date to backfill, "YYYY-MM-DD". Default is the checker's end_date.
+        """
+        self.checker = checker
+        self.db_table_name = db_table_name
+        self.insert_chunk_size = insert_chunk_size
+        self.new_records = RecordStore(DIVIDEND_SCHEMA)
+        self.inserted_count = 0
+        self._pending_records: list[dict] = []
+
+        # Normalise cutoff_date to "YYYY-MM-DD" so it compares with the parsed ex-dates
+        self.cutoff_date = datetime.strptime(cutoff_date, "%Y-%m-%d").strftime("%Y-%m-%d")
+
+        self.end_date = end_date or checker.end_date
+
+        # Every key the scrape could produce lies in [cutoff_date, end_date], so load them once
+        self.existing_keys = checker._load_existing_keys(db_table_name, self.cutoff_date, self.end_date)
+        LOGGER.info(f"Loaded {len(self.existing_keys)} existing keys between {self.cutoff_date} and {self.end_date}")
+
+    def accept_row(self, row: DividendRow) -> bool:
+        """
+        Queues a parsed row for insert if it is missing from the database.
+        Returns False once the rows are older than cutoff_date.
+        """
+        # Stop check using the cutoff date 
+        if row.ex_date < self.cutoff_date:
+            LOGGER.info(f"Stop condition met: Found date {row.ex_date} which is older than cutoff {self.cutoff_date}.")
+            return False
+
+        if row.symbol not in self.checker.allowed_symbols:
+            self.checker.metrics.count("skips")
+            return True
+
+        # Skip records whose key (symbol, date) already exists, or was already queued
+        key = (f"{row.symbol}.JK", row.ex_date)
+        if key in self.existing_keys or row.ex_date > self.end_date:
+            self.checker.metrics.count("skips")
+            return True
+
+        if self.checker.metrics.sampled("record"):
+            LOGGER.debug(f"New record found: {row.symbol} on {row.ex_date}. Queued for insert")
+        self.existing_keys.add(key)
+
+        data_dict = {
+            "symbol": key[0],
+            "date": row.ex_date,
+            "dividend_original": row.amount,
+            "dividend": row.amount, 
+            "updated_on": self.checker.run_timestamp,
+        }
+        self._pending_records.append(data_dict)
+        self.new_records.append(data_dict)
+        return True
+
+    def flush(self, force: bool = False):
+        """
+        Inserts the queued records once a full chunk is pending, or whatever is pending if force is True.
+        Called after every page, so a late failure does not lose the whole backfill.
+        """
+        if force or len(self._pending_records) >= self.insert_chunk_size:
+            self.inserted_count += self.checker._insert_in_chunks(self.db_table_name,
+                                                                  self._pending_records,
+                                                                  self.insert_chunk_size)
+            self._pending_records = []
+
+# Standalone incremental run; the scheduled nightly job is orchestrator.py
 if __name__ == "__main__":
-    url, key = os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY")
-    supabase_client = create_client(url, key)
+    metrics = RunMetrics.from_env("dividend_checker")
+    setup_logging(debug_records=bool(metrics.log_every))
+    supabase_client = create_supabase_client()
 
-    stock_split_checker = DividendChecker(supabase_client)
-    stock_split_checker.get_dividend_records(include_payment_date=True)
+    stock_split_checker = DividendChecker(supabase_client, metrics=metrics)
+    # Written at exit, including when upsert_to_db exits early with nothing to write
+    atexit.register(stock_split_checker.write_run_report)
+    # Scrape and upsert DB in micro-batches
+    stock_split_checker.upsert_stream(include_payment_date=True, incremental=True)
 
     # Run the dividend check and fill missing data
     # stock_split_checker.check_fill_missing_dividend()
 
-    # Upsert DB
-    stock_split_checker.upsert_to_db()
-
     logging.info(f"update {date.today()} dividend data")
 
     if check_start_year():
@@ -0,0 +1,312 @@
+from concurrent.futures  import ThreadPoolExecutor
+from pathlib             import Path
+from requests.adapters   import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+import hashlib
+import json
+import logging
+import os
+import requests
+import threading
+import time
+
+
+LOGGER = logging.getLogger(__name__)
+
+# Status codes that mean "slow down" rather than "this page is broken"
+_THROTTLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """
+    Parse a Retry-After header given in seconds. HTTP-date values are ignored.
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        return None
+
+
+class TokenBucket:
+    def __init__(self, rate: float = 2.0, capacity: int = 4, min_rate: float = 0.1):
+        """
+        Thread-safe token bucket whose refill rate backs off when the server throttles us.
+
+        The rate is halved on every throttled response and recovers additively on
+        every successful one, so a healthy crawl runs at `rate` requests per second
+        while a struggling server is given room to recover.
+
+        Args:
+            rate (float): Maximum sustained requests per second. Default is 2.0
+            capacity (int): Maximum burst size. Default is 4
+            min_rate (float): Lower bound for the refill rate after back-offs. Default is 0.1
+        """
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min_rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, stop_event: threading.Event | None = None) -> bool:
+        """
+        Block until a token is available. Returns False if stop_event was set while waiting.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._blocked_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = max(self._blocked_until - now, (1 - self._tokens) / self.rate)
+
+            if stop_event is None:
+                time.sleep(wait)
+            elif stop_event.wait(wait):
+                return False
+
+    def backoff(self, retry_after: float | None = None):
+        """
+        Halve the refill rate and block every caller for retry_after seconds
+        (or one refill interval when the server did not say).
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.rate = max(self.min_rate, self.rate / 2)
+            delay = retry_after if retry_after is not None else 1 / self.rate
+            self._blocked_until = max(self._blocked_until, now + delay)
+            self._tokens = 0.0
+            self._updated = now
+
+    def recover(self):
+        """
+        Additively restore the refill rate after a successful request.
+        """
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * 0.1)
+
+
+class ResponseCache:
+    def __init__(self, directory: str | Path = Path(".cache") / "responses", ttl: float = 3600):
+        """
+        On-disk cache of successful page responses, so crawls of the same run, or a rerun
+        within the hour restoring the .cache directory, reuse the pages already fetched.
+
+        Args:
+            directory (str | Path): Directory holding one JSON file per URL. Default is .cache/responses
+            ttl (float): Seconds a cached response stays valid. Default is 3600
+        """
+        self.directory = Path(directory)
+        self.ttl = ttl
+        self._pruned = False
+
+    def _path(self, url: str) -> Path:
+        return self.directory / f"{hashlib.sha256(url.encode()).hexdigest()}.json"
+
+    def prune(self):
+        """
+        Removes expired entries.
+        """
+        if not self.directory.is_dir():
+            return
+        expired_before = time.time() - self.ttl
+        for path in self.directory.glob("*.json"):
+            if path.stat().st_mtime < expired_before:
+                path.unlink(missing_ok=True)
+
+    def get(self, url: str) -> requests.Response | None:
+        if not self._pruned:
+            self.prune()
+            self._pruned = True
+
+        path = self._path(url)
+        try:
+            if time.time() - path.stat().st_mtime > self.ttl:
+                return None
+            entry = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+        response = requests.Response()
+        response.url = url
+        response.status_code = entry["status_code"]
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response.encoding = entry["encoding"]
+        response._content = entry["body"].encode(entry["encoding"] or "utf-8")
+        return response
+
+    def put(self, url: str, response: requests.Response):
+        if response.status_code != 200:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(url)
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp_path.write_text(json.dumps({
+            "status_code": response.status_code,
+            "headers": {key: value for key, value in response.headers.items() if key in ("ETag", "Last-Modified")},
+            "encoding": response.encoding,
+            "body": response.text,
+        }), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+
+class PageFetcher:
+    def __init__(self,
+                 url_template: str,
+                 prefetch: int = 4,
+                 rate: float = 2.0,
+                 burst: int = 4,
+                 timeout: float = 15,
+                 max_retries: int = 5,
+                 backoff_base: float = 1.0,
+                 backoff_cap: float = 60.0,
+                 cache: ResponseCache | None = None,
+                 pool_size: int | None = None):
+        """
+        Keep-alive page fetcher shared by the SahamIDX crawls.
+
+        Pages are fetched through one pooled requests.Session. While the caller
+        parses page N, pages N+1..N+prefetch are already being fetched on a
+        thread pool, all of them going through the same token bucket.
+
+        Args:
+            url_template (str): URL with a `{page}` placeholder.
+            prefetch (int): Number of pages to fetch ahead of the one being consumed. Default is 4
+            rate (float): Maximum requests per second. Default is 2.0
+            burst (int): Maximum burst of requests. Default is 4
+            timeout (float): Per-request timeout in seconds. Default is 15
+            max_retries (int): How often a page is retried after a network error or a 429/5xx
+                response. Default is 5
+            backoff_base (float): First delay in seconds after a network error, doubled on every
+                further attempt. Default is 1.0
+            backoff_cap (float): Upper bound for that delay. Default is 60.0
+            cache (ResponseCache | None): If given, fresh cached pages are served without a request.
+            pool_size (int | None): Keep-alive connections kept open. Default is prefetch + 1, enough for
+                one crawl at a time; raise it when several crawls share the fetcher.
+        """
+        self.url_template = url_template
+        self.prefetch = max(prefetch, 0)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.rate_limiter = TokenBucket(rate=rate, capacity=burst)
+        self.cache = cache
+        # Attempts repeated after a network error or a throttled response, across all pages
+        self.retries = 0
+        self._retries_lock = threading.Lock()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size or self.prefetch + 1)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def fetch(self,
+              page: int,
+              stop_event: threading.Event | None = None,
+              headers: dict | None = None) -> requests.Response | None:
+        """
+        Fetch a single page, waiting on the rate limiter and retrying only this page on failure.
+
+        Network errors are retried with exponential backoff, 429/5xx responses slow the shared
+        rate limiter down. The last error is raised (or the last throttled response returned)
+        once max_retries is exhausted. Returns None if stop_event was set while waiting.
+        Extra headers (e.g. conditional request headers) are sent with every attempt.
+        """
+        url = self.url_template.format(page=page)
+        if self.cache is not None and (response := self.cache.get(url)) is not None:
+            return response
+        response = None
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                with self._retries_lock:
+                    self.retries += 1
+            if not self.rate_limiter.acquire(stop_event):
+                return None
+
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.timeout)
+            except requests.exceptions.RequestException as error:
+                if attempt == self.max_retries:
+                    raise
+                delay = min(self.backoff_cap, self.backoff_base * 2 ** attempt)
+                LOGGER.warning(f"Page {page} failed on attempt {attempt + 1} ({error}), retrying in {delay:.1f}s")
+                if stop_event is not None and stop_event.wait(delay):
+                    return None
+                if stop_event is None:
+                    time.sleep(delay)
+                continue
+
+            if response.status_code not in _THROTTLE_STATUS_CODES:
+                self.rate_limiter.recover()
+                if self.cache is not None:
+                    self.cache.put(url, response)
+                return response
+
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            self.rate_limiter.backoff(retry_after)
+            LOGGER.warning(f"Page {page} returned {response.status_code}, backing off to {self.rate_limiter.rate:.2f} req/s")
+
+        return response
+
+    def iter_pages(self,
+                   start_page: int = 1,
+                   end_page: int | None = None,
+                   headers_for_page=None,
+                   probe_first: bool = False):
+        """
+        Yield (page, response) in page order, prefetching the following pages concurrently.
+
+        Closing the generator (break inside `contextlib.closing`, or an exception in the
+        caller) cancels every prefetch that has not gone out yet.
+
+        Args:
+            start_page (int): First page to fetch. Default is 1
+            end_page (int | None): Last page to fetch (inclusive). None means no upper bound
+            headers_for_page (Callable[[int], dict] | None): Extra request headers per page.
+            probe_first (bool): If True, nothing is prefetched until the first page has been
+                consumed, so a crawl that stops on its first page costs a single request.
+        """
+        stop_event = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=self.prefetch or 1)
+        pending = {}
+        next_page = start_page
+        page = start_page
+
+        try:
+            while end_page is None or page <= end_page:
+                window = 0 if probe_first and page == start_page else self.prefetch
+                while next_page <= page + window and (end_page is None or next_page <= end_page):
+                    headers = headers_for_page(next_page) if headers_for_page else None
+                    pending[next_page] = executor.submit(self.fetch, next_page, stop_event, headers)
+                    next_page += 1
+
+                LOGGER.info(f"Fetching page {page}...")
+                yield page, pending.pop(page).result()
+                page += 1
+
+        finally:
+            stop_event.set()
+            for future in pending.values():
+                future.cancel()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,24 +1,18 @@
+import atexit
 import json
-import os
 import pandas as pd
 import logging
-from imp import reload
 
-from dotenv import load_dotenv
 import requests
-from supabase import create_client, Client
-from typing import final
+from typing import TYPE_CHECKING, NamedTuple, final
 
-from dividend_checker import DividendChecker
+from db_utils import chunked, create_supabase_client, select_paginated
+from dividend_checker import DividendChecker, setup_logging
+from run_metrics import RunMetrics
+from record_store import UPCOMING_DIVIDEND_SCHEMA
 
-LOG_FILENAME = 'scrapper.log'
-
-def initiate_logging(LOG_FILENAME):
-    reload(logging)
-
-    formatLOG = '%(asctime)s - %(levelname)s: %(message)s'
-    logging.basicConfig(filename=LOG_FILENAME,level=logging.INFO, format=formatLOG)
-    logging.info('Program started')
+if TYPE_CHECKING:
+    from supabase import Client
 
 # Default next N days of dividend ex-date to fetch
 _DEFAULT_TIMEFRAME = 14  # days
@@ -26,76 +20,169 @@ _DEFAULT_TIMEFRAME = 14  # days
 _RETENTION_PERIOD = 14  # days
 _LOCAL_TIMEZONE = 'Asia/Bangkok'
 _LOCAL_TODAY = pd.Timestamp.now(_LOCAL_TIMEZONE).date()
+# Columns that make a stored upcoming dividend differ from a scraped one (updated_on excluded)
+_COMPARED_COLUMNS = ("dividend_amount", "cum_date", "recording_date", "payment_date")
+
 
-load_dotenv()
+class UpcomingDividendChanges(NamedTuple):
+    inserted: list[dict]
+    updated: list[dict]
+    # Rows removed because their payment date is older than deletion_date
+    deleted: list[dict]
+    unchanged: int
+    deletion_date: str
 
-_SUPABASE_URL = os.getenv("SUPABASE_URL")
-_SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-_supabase_client = create_client(_SUPABASE_URL, _SUPABASE_KEY)
+
+def _same_value(scraped, stored) -> bool:
+    # numeric columns may come back as int, float or string depending on the column type
+    if isinstance(scraped, (int, float)) and stored is not None:
+        try:
+            return abs(float(scraped) - float(stored)) < 1e-9
+        except (TypeError, ValueError):
+            return False
+    return scraped == stored
 
 
 class FutureDividendChecker(DividendChecker):
-    def __init__(self, supabase_client: Client, future_n_day=14):
-        super().__init__(supabase_client)
+    table_name = "idx_upcoming_dividend"
+    record_schema = UPCOMING_DIVIDEND_SCHEMA
+
+    def __init__(self, supabase_client: "Client", future_n_day=14, fetcher=None, allowed_symbols=None, metrics=None):
+        super().__init__(supabase_client, fetcher=fetcher, allowed_symbols=allowed_symbols, metrics=metrics)
         # override the start_date and end_date to future date
         self.start_date = pd.Timestamp.now("Asia/Bangkok").strftime("%Y-%m-%d")
         self.end_date = (pd.Timestamp.now("Asia/Bangkok") + pd.Timedelta(days=future_n_day)).strftime("%Y-%m-%d")
 
     @final
-    def get_dividend_records(self, include_payment_date=True):
-        super().get_dividend_records(include_payment_date=True)
+    def get_dividend_records(self, include_payment_date=True, incremental=False):
+        super().get_dividend_records(include_payment_date=True, incremental=incremental)
+
+    @final
+    def begin_crawl(self, include_payment_date=True, watermark=None, record_sink=None):
+        super().begin_crawl(include_payment_date=True, watermark=watermark, record_sink=record_sink)
+
+    @final
+    def format_record(self, record):
         # Transform the record names accordingly to match the future_dividend table attributes
-        for record in self.retrieved_records:
+        if "date" in record:
             record["ex_date"] = record.pop("date")
             record["dividend_amount"] = record.pop("dividend")
 
             record.pop("dividend_original")
+        return record
 
     @final
-    def upsert_to_db(self):
-        if not self.retrieved_records:
-            print("No records to upsert to database. All data is up to date")
-            raise SystemExit(0)
+    def finish_crawl(self):
+        for record in self.retrieved_records:
+            self.format_record(record)
+
+    def _load_current_rows(self) -> dict[tuple[str, str], dict]:
+        """
+        Reads the whole table once, keyed on (symbol, ex_date). It only ever holds the upcoming
+        window plus the retention period, so this is a handful of paginated selects.
+        """
+        def build_query():
+            return self.supabase_client.from_(self.table_name) \
+                       .select(",".join(("symbol", "ex_date", *_COMPARED_COLUMNS))) \
+                       .order("ex_date") \
+                       .order("symbol")
+
+        current_rows = {}
+        for rows in self.metrics.timed(select_paginated(build_query), "db_read"):
+            self.db_calls += 1
+            current_rows.update(((row["symbol"], row["ex_date"]), row) for row in rows)
+        return current_rows
+
+    def diff_against_db(self, retention_period=_RETENTION_PERIOD) -> UpcomingDividendChanges:
+        """
+        Compares the retrieved records with the table state, without writing anything.
+
+        Args:
+            retention_period (int): Days a row is kept after its payment date. Default is 14
+        """
+        deletion_date = (_LOCAL_TODAY - pd.Timedelta(days=retention_period)).isoformat()
+        current_rows = self._load_current_rows()
+
+        inserted, updated = [], []
+        for record in self.retrieved_records:
+            current = current_rows.get((record["symbol"], record["ex_date"]))
+            if current is None:
+                inserted.append(record)
+            elif any(not _same_value(record.get(column), current.get(column)) for column in _COMPARED_COLUMNS):
+                updated.append(record)
+
+        deleted = [row for row in current_rows.values()
+                   if row.get("payment_date") and row["payment_date"] < deletion_date]
+
+        return UpcomingDividendChanges(inserted, updated, deleted,
+                                       len(self.retrieved_records) - len(inserted) - len(updated),
+                                       deletion_date)
+
+    @final
+    def upsert_to_db(self, retention_period=_RETENTION_PERIOD, chunk_size=500) -> UpcomingDividendChanges:
+        """
+        Writes only the new and changed upcoming dividends, in upsert batches of chunk_size,
+        and removes the rows past their retention period in the same pass.
+
+        Args:
+            retention_period (int): Days a row is kept after its payment date. Default is 14
+            chunk_size (int): Records per upsert request. Default is 500
+
+        Returns:
+            UpcomingDividendChanges: Inserted, updated and deleted rows, for downstream consumers.
+        """
+        changes = self.diff_against_db(retention_period)
 
         try:
-            self.supabase_client.table("idx_upcoming_dividend").upsert(
-                self.retrieved_records
-            ).execute()
-            print(
-                f"Successfully upserted {len(self.retrieved_records)} data to database"
-            )
-            # Insert news, commented for now
-            # print("Sending data to external endpoint")
-            # api_key = os.getenv("API_KEY")
-            # headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
-            # response = requests.post(
-            #     "https://sectors-news-endpoint.fly.dev/dividend",
-            #     headers=headers,
-            #     data=json.dumps(self.retrieved_records)
-            # )
-            # if response.status_code == 200:
-            #     print("Successfully sent data to external endpoint")
-            # else:
-            #     print(f"Failed to send data to external endpoint. Status code: {response.status_code}, {response.text}")
+            with self.metrics.timer("db_write"):
+                for chunk in chunked(changes.inserted + changes.updated, chunk_size):
+                    self.supabase_client.table(self.table_name).upsert(chunk).execute()
+                    self.db_calls += 1
+
+                if changes.deleted:
+                    self.supabase_client.table(self.table_name).delete().lt("payment_date", changes.deletion_date).execute()
+                    self.db_calls += 1
         except Exception as e:
             raise Exception(f"Error upserting to database: {e}")
 
+        print(
+            f"Upcoming dividends: {len(changes.inserted)} inserted, {len(changes.updated)} updated, "
+            f"{changes.unchanged} unchanged, {len(changes.deleted)} deleted past {changes.deletion_date}"
+        )
+        # Insert news, commented for now
+        # print("Sending data to external endpoint")
+        # api_key = os.getenv("API_KEY")
+        # headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+        # response = requests.post(
+        #     "https://sectors-news-endpoint.fly.dev/dividend",
+        #     headers=headers,
+        #     data=json.dumps(changes.inserted + changes.updated)
+        # )
+        # if response.status_code == 200:
+        #     print("Successfully sent data to external endpoint")
+        # else:
+        #     print(f"Failed to send data to external endpoint. Status code: {response.status_code}, {response.text}")
+
+        self.commit_watermark()
+        return changes
+
     @final
     def upsert_yield_in_db(self):
         raise NotImplementedError("Future dividend does not require yield update")
 
 
+# Standalone incremental run; the scheduled nightly job is orchestrator.py
 if __name__ == "__main__":
 
-    initiate_logging(LOG_FILENAME)
+    metrics = RunMetrics.from_env("future_dividend_checker")
+    setup_logging(debug_records=bool(metrics.log_every))
 
     # Update upcoming dividend data
-    future_dividend_checker = FutureDividendChecker(_supabase_client)
-    future_dividend_checker.get_dividend_records()
+    future_dividend_checker = FutureDividendChecker(create_supabase_client(), metrics=metrics)
+    atexit.register(future_dividend_checker.write_run_report)
+    future_dividend_checker.get_dividend_records(incremental=True)
+    # Writes the changes and deletes past dividend data from the same table
     future_dividend_checker.upsert_to_db()
-
-    # Delete past dividend data from the same table
-    deletion_date = _LOCAL_TODAY - pd.Timedelta(days=_RETENTION_PERIOD)
-    _supabase_client.table("idx_upcoming_dividend").delete().lt("payment_date", deletion_date.isoformat()).execute()
+    future_dividend_checker.archive_run()
 
     logging.info(f"update {_LOCAL_TODAY} upcoming dividend data")
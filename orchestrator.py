@@ -0,0 +1,225 @@
+from datetime        import date
+from fetcher         import PageFetcher, ResponseCache
+from symbol_universe import SymbolUniverse
+from run_metrics     import RunMetrics
+from db_utils        import create_supabase_client
+from typing          import Callable, NamedTuple
+
+from dividend_checker        import SAHAMIDX_URL, BackfillDiff, DividendChecker, check_start_year, setup_logging
+from future_dividend_checker import FutureDividendChecker
+from combined_checker        import crawl_windows
+
+import argparse
+import asyncio
+import logging
+import time
+
+
+LOGGER = logging.getLogger(__name__)
+
+JOBS = ("daily", "upcoming", "yield")
+
+
+class JobResult(NamedTuple):
+    name: str
+    ok: bool
+    seconds: float
+    # What the job did, or why it failed
+    detail: str
+
+
+class Orchestrator:
+    def __init__(self,
+                 supabase_client,
+                 max_concurrency: int = 2,
+                 prefetch: int = 4,
+                 backfill_cutoff: str | None = None):
+        """
+        Runs the daily dividend, upcoming dividend and yield jobs of one night in a single process.
+        This is the scheduled entry point.
+
+        All jobs share one Supabase client, one pooled PageFetcher and one symbol universe. The
+        daily and upcoming jobs read the listing from a single crawl_windows pass, with both
+        checkers (and the backfill, if asked for) as sinks, then write their tables concurrently.
+        Job stages are blocking, so each one runs on a worker thread; at most max_concurrency
+        stages run at the same time across all jobs.
+
+        The nightly crawl is not incremental: each checker's whole window is re-read and upserted
+        with upsert_to_db, which for ~30 days of listing is a handful of pages. The watermark,
+        the streamed micro-batch upsert and the page checkpoint belong to the standalone
+        dividend_checker.py / future_dividend_checker.py runs over long windows.
+
+        Args:
+            supabase_client (Client): Supabase client shared by every job.
+            max_concurrency (int): Maximum number of stages running at once. Default is 2
+            prefetch (int): Pages the crawl fetches ahead. Default is 4
+            backfill_cutoff (str | None): If given, the daily job's crawl also inserts the idx_dividend
+                rows missing back to this "YYYY-MM-DD" date.
+        """
+        self.supabase_client = supabase_client
+        self.fetcher = PageFetcher(SAHAMIDX_URL, prefetch=prefetch, cache=ResponseCache())
+        self.allowed_symbols = SymbolUniverse(supabase_client)
+        self.max_concurrency = max_concurrency
+        self.backfill_cutoff = backfill_cutoff
+        self.backfill: BackfillDiff | None = None
+        self.crawl_metrics = RunMetrics.from_env("crawl", profile_thread=False)
+        self._budget: asyncio.Semaphore | None = None
+        self._checkers: dict[str, DividendChecker] = {}
+        self._crawl: asyncio.Task | None = None
+
+    def _checker(self, checker_class, name: str):
+        return checker_class(self.supabase_client,
+                             fetcher=self.fetcher,
+                             allowed_symbols=self.allowed_symbols,
+                             metrics=RunMetrics.from_env(name, profile_thread=False))
+
+    async def _stage(self, job_metrics: RunMetrics, func: Callable, *args, **kwargs):
+        """
+        Runs one blocking stage on a worker thread, profiled into job_metrics when PROFILE_RUN is set.
+        """
+        def run_profiled():
+            with job_metrics.profiled():
+                return func(*args, **kwargs)
+
+        async with self._budget:
+            return await asyncio.to_thread(run_profiled)
+
+    async def _run_job(self, name: str, job) -> JobResult:
+        """
+        Awaits one job and turns its outcome into a JobResult. SystemExit(0), raised by
+        upsert_to_db when there is nothing to write, counts as success and stops only that job.
+        """
+        started = time.monotonic()
+        try:
+            detail = await job()
+            ok = True
+        except SystemExit as exit_request:
+            ok = exit_request.code in (None, 0)
+            detail = "nothing to write" if ok else f"exited with {exit_request.code}"
+        except Exception as error:
+            LOGGER.exception(f"Job {name} failed")
+            ok, detail = False, f"{type(error).__name__}: {error}"
+
+        result = JobResult(name, ok, round(time.monotonic() - started, 3), detail)
+        LOGGER.info(f"Job {name} {'succeeded' if ok else 'failed'} in {result.seconds}s: {detail}")
+        return result
+
+    def _crawl_listing(self, checkers: list[DividendChecker]) -> int:
+        if self.backfill_cutoff and "daily" in self._checkers:
+            self.backfill = BackfillDiff(self._checkers["daily"], self.backfill_cutoff)
+        return crawl_windows(self.fetcher, checkers, backfill=self.backfill, metrics=self.crawl_metrics)
+
+    async def crawl(self, checkers: list[DividendChecker]) -> int:
+        """
+        Crawls the listing once, feeding every row to each checker (and the backfill), until none
+        needs more pages. Returns the number of pages crawled.
+        """
+        try:
+            return await self._stage(self.crawl_metrics, self._crawl_listing, checkers)
+        finally:
+            self.crawl_metrics.counters["retries"] = self.fetcher.retries
+            # The jobs share the symbol universe, so its loads are reported once, here
+            self.crawl_metrics.counters["db_calls"] = self.allowed_symbols.db_calls
+            self.crawl_metrics.write_report()
+
+    async def daily(self) -> str:
+        checker = self._checkers["daily"]
+        try:
+            await self._crawl
+            await self._stage(checker.metrics, checker.upsert_to_db)
+            await self._stage(checker.metrics, checker.archive_run)
+        finally:
+            checker.write_run_report()
+        detail = f"upserted {len(checker.retrieved_records)} records"
+        if self.backfill:
+            detail += f", backfilled {self.backfill.inserted_count}"
+        return detail
+
+    async def upcoming(self) -> str:
+        checker = self._checkers["upcoming"]
+        try:
+            await self._crawl
+            changes = await self._stage(checker.metrics, checker.upsert_to_db)
+            await self._stage(checker.metrics, checker.archive_run)
+        finally:
+            checker.write_run_report()
+        return (f"{len(changes.inserted)} inserted, {len(changes.updated)} updated, "
+                f"{changes.unchanged} unchanged, {len(changes.deleted)} deleted")
+
+    async def yield_update(self) -> str:
+        checker = self._checker(DividendChecker, "yield")
+        try:
+            await self._stage(checker.metrics, checker.upsert_yield_in_db)
+        finally:
+            checker.write_run_report()
+        return "missing yields updated"
+
+    async def run(self, jobs: tuple[str, ...] = JOBS) -> list[JobResult]:
+        """
+        Runs the selected jobs concurrently and returns one JobResult per job, in the order given.
+        The daily and upcoming jobs wait for the shared crawl; the yield job waits for the daily
+        job, whose new rows may still lack a yield.
+        """
+        self._budget = asyncio.Semaphore(self.max_concurrency)
+        # Load the universe once up front, instead of letting concurrent jobs race to refresh it
+        try:
+            await asyncio.to_thread(lambda: self.allowed_symbols.symbols)
+        except Exception as error:
+            LOGGER.warning(f"Could not preload the symbol universe, jobs will load it themselves: {error}")
+
+        if "daily" in jobs:
+            self._checkers["daily"] = self._checker(DividendChecker, "daily")
+        if "upcoming" in jobs:
+            self._checkers["upcoming"] = self._checker(FutureDividendChecker, "upcoming")
+        if self._checkers:
+            self._crawl = asyncio.create_task(self.crawl(list(self._checkers.values())))
+
+        tasks = {}
+        if "daily" in jobs:
+            tasks["daily"] = asyncio.create_task(self._run_job("daily", self.daily))
+        if "upcoming" in jobs:
+            tasks["upcoming"] = asyncio.create_task(self._run_job("upcoming", self.upcoming))
+        if "yield" in jobs:
+            async def yield_after_daily():
+                if "daily" in tasks:
+                    await tasks["daily"]
+                return await self.yield_update()
+            tasks["yield"] = asyncio.create_task(self._run_job("yield", yield_after_daily))
+
+        try:
+            return list(await asyncio.gather(*tasks.values()))
+        finally:
+            self.fetcher.close()
+
+
+def main(jobs: tuple[str, ...], max_concurrency: int, backfill_cutoff: str | None = None) -> int:
+    # Stages run on worker threads and are profiled per job, so the event loop thread is not profiled
+    metrics = RunMetrics.from_env("orchestrator", profile_thread=False)
+    setup_logging(debug_records=bool(metrics.log_every))
+
+    orchestrator = Orchestrator(create_supabase_client(),
+                                max_concurrency=max_concurrency,
+                                backfill_cutoff=backfill_cutoff)
+    results = asyncio.run(orchestrator.run(jobs))
+
+    metrics.write_report(jobs=[result._asdict() for result in results])
+    for result in results:
+        print(f"{result.name:<10} {'ok' if result.ok else 'FAILED':<7} {result.seconds:>8.1f}s  {result.detail}")
+
+    logging.info(f"update {date.today()} {', '.join(jobs)} jobs")
+    return 0 if all(result.ok for result in results) else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the nightly dividend jobs concurrently in one process")
+    parser.add_argument("--jobs", nargs="+", choices=JOBS, default=None,
+                        help="Jobs to run. Default is daily and upcoming, plus yield in the first week of January")
+    parser.add_argument("--max-concurrency", type=int, default=2, help="Maximum number of job stages running at once")
+    parser.add_argument("--backfill-cutoff", help="Also backfill missing idx_dividend rows back to this YYYY-MM-DD date, "
+                                                  "from the daily job's crawl")
+    args = parser.parse_args()
+
+    jobs = tuple(args.jobs) if args.jobs else ("daily", "upcoming") + (("yield",) if check_start_year() else ())
+    if args.backfill_cutoff and "daily" not in jobs:
+        parser.error("--backfill-cutoff needs the daily job")
+    raise SystemExit(main(jobs, args.max_concurrency, args.backfill_cutoff))
@@ -0,0 +1,104 @@
+from concurrent.futures import ThreadPoolExecutor
+from fetcher            import PageFetcher
+from page_parser        import DividendRow, parse_dividend_page
+
+import logging
+import requests
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+class PageLocator:
+    def __init__(self, fetcher: PageFetcher):
+        """
+        Finds the listing pages covering a date window by bisection.
+
+        The SahamIDX listing is sorted by ex-date descending, so each page spans
+        [oldest, newest] ex-dates that only move back in time as the page number grows.
+        Every probed page is parsed once and kept, so the crawl does not fetch it again.
+
+        Args:
+            fetcher (PageFetcher): Fetcher for the listing pages.
+        """
+        self.fetcher = fetcher
+        self.probes = 0
+        self._pages: dict[int, list[DividendRow]] = {}
+
+    def rows(self, page: int) -> list[DividendRow]:
+        """
+        Returns the parsed rows of a page, fetching it on first use.
+        """
+        if page not in self._pages:
+            response = self.fetcher.fetch(page)
+            if response.status_code != 200:
+                raise requests.exceptions.HTTPError(f"Error retrieving page {page} from SahamIDX, "
+                                                    f"status code {response.status_code}")
+            self._pages[page] = parse_dividend_page(response.text).rows
+            self.probes += 1
+        return self._pages[page]
+
+    def _bounds(self, page: int) -> tuple[str, str] | None:
+        """
+        (oldest, newest) ex-date on the page, or None past the last page.
+        """
+        ex_dates = [row.ex_date for row in self.rows(page)]
+        return (min(ex_dates), max(ex_dates)) if ex_dates else None
+
+    def _first_true(self, low: int, high: int, predicate) -> int:
+        """
+        Smallest page in [low, high] for which the monotonic predicate holds (high if none does before it).
+        """
+        while low < high:
+            middle = (low + high) // 2
+            if predicate(middle):
+                high = middle
+            else:
+                low = middle + 1
+        return low
+
+    def locate(self, start_date: str, end_date: str) -> range:
+        """
+        Returns the range of pages holding ex-dates within [start_date, end_date] (possibly empty),
+        in O(log pages) probes.
+
+        Args:
+            start_date (str): Oldest ex-date of the window, "YYYY-MM-DD".
+            end_date (str): Newest ex-date of the window, "YYYY-MM-DD".
+        """
+        def past_window(page: int) -> bool:
+            bounds = self._bounds(page)
+            return bounds is None or bounds[1] < start_date
+
+        def reaches_window(page: int) -> bool:
+            bounds = self._bounds(page)
+            return bounds is None or bounds[0] <= end_date
+
+        # Gallop to a page entirely older than the window (or past the last page)
+        high = 1
+        while not past_window(high):
+            high *= 2
+
+        first_page = self._first_true(1, high, reaches_window)
+        end_page = self._first_true(first_page, high, past_window)
+
+        LOGGER.info(f"Pages {first_page}..{end_page - 1} cover {start_date}..{end_date} ({self.probes} probes)")
+        return range(first_page, end_page)
+
+    def iter_rows(self, pages: range, shards: int = 4):
+        """
+        Yields the rows of the given pages in page order. Pages not probed yet are fetched
+        by `shards` workers in parallel, all sharing the fetcher's rate limiter.
+        """
+        missing = [page for page in pages if page not in self._pages]
+        with ThreadPoolExecutor(max_workers=max(shards, 1)) as executor:
+            fetched = dict(zip(missing, executor.map(self.fetcher.fetch, missing)))
+
+        for page in pages:
+            if page in fetched:
+                response = fetched[page]
+                if response.status_code != 200:
+                    raise requests.exceptions.HTTPError(f"Error retrieving page {page} from SahamIDX, "
+                                                        f"status code {response.status_code}")
+                self._pages[page] = parse_dividend_page(response.text).rows
+            yield from self._pages[page]
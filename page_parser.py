@@ -0,0 +1,114 @@
+from datetime import datetime
+from typing   import NamedTuple
+
+import logging
+import lxml.html
+import pandas as pd
+
+
+LOGGER = logging.getLogger(__name__)
+
+_SITE_DATE_FORMAT = "%d-%b-%Y"
+
+# Only rows of the dividend table carry these cells; navigation and layout rows are never visited
+_ROWS_XPATH = "//tr[td[@data-header='Nama'] and td[@data-header='Amount'] and td[@data-header='Ex Date']]"
+
+_DATE_COLUMNS = {
+    "ex_date": "Ex Date",
+    "cum_date": "Cum Date",
+    "recording_date": "Recording Date",
+    "payment_date": "Payment Date",
+}
+
+# Site date string -> "YYYY-MM-DD" (None if unparsable); the same few dates repeat across rows and pages
+_DATE_CACHE: dict[str, str | None] = {}
+
+
+class DividendRow(NamedTuple):
+    symbol: str
+    amount: float
+    ex_date: str
+    cum_date: str | None
+    recording_date: str | None
+    payment_date: str | None
+
+
+class ParsedPage(NamedTuple):
+    rows: list[DividendRow]
+    # Number of dividend rows on the page, including those that failed to parse
+    data_rows: int
+    # Column name -> number of non-empty cells that failed to parse
+    errors: dict[str, int] = {}
+
+
+def to_iso_date(value: str) -> str:
+    """
+    Convert a SahamIDX date such as "08-Aug-2024" to "YYYY-MM-DD".
+    """
+    return datetime.strptime(value, _SITE_DATE_FORMAT).strftime("%Y-%m-%d")
+
+
+def to_iso_dates(values: list[str]) -> list[str | None]:
+    """
+    Convert a column of SahamIDX dates to "YYYY-MM-DD" in one vectorized pass.
+
+    Strings not seen before are parsed together with pd.to_datetime and memoized;
+    empty or unparsable values become None.
+    """
+    unseen = list({value for value in values if value not in _DATE_CACHE})
+    if unseen:
+        parsed = pd.to_datetime(pd.Series(unseen, dtype=object), format=_SITE_DATE_FORMAT, errors="coerce")
+        formatted = parsed.dt.strftime("%Y-%m-%d")
+        # NaT formats to NaN, which where(..., None) keeps on an object Series, so map it to None by hand
+        _DATE_CACHE.update(zip(unseen, (value if valid else None for value, valid in zip(formatted, parsed.notna()))))
+    return [_DATE_CACHE[value] for value in values]
+
+
+def parse_dividend_page(html: str | bytes) -> ParsedPage:
+    """
+    Parse one /deviden/page/{page} listing into typed rows.
+
+    Each row of the dividend table is walked once, collecting its `data-header`
+    cells into columns that are then normalized per column. Rows whose amount
+    or ex-date cannot be parsed are dropped, an unparsable optional date becomes
+    None, and the failures are reported per column instead of per row.
+
+    Args:
+        html (str | bytes): Page body as returned by the site.
+    """
+    if not html or not html.strip():
+        return ParsedPage([], 0)
+
+    tree = lxml.html.fromstring(html)
+    table_rows = tree.xpath(_ROWS_XPATH)
+    if not table_rows:
+        return ParsedPage([], 0)
+
+    columns = {header: [] for header in ("Nama", "Amount", *_DATE_COLUMNS.values())}
+    for tr in table_rows:
+        cells = {td.get("data-header"): td.text_content().strip() for td in tr.iterchildren("td")}
+        for header, values in columns.items():
+            values.append(cells.get(header, ""))
+
+    amounts = pd.to_numeric(pd.Series(columns["Amount"], dtype=object), errors="coerce").astype(float)
+    # Cast to object first: where() on a float Series would turn None back into NaN
+    parsed = {"amount": amounts.astype(object).where(amounts.notna(), None).tolist()}
+    parsed.update((name, to_iso_dates(columns[header])) for name, header in _DATE_COLUMNS.items())
+
+    errors = {}
+    for name, header in (("amount", "Amount"), *_DATE_COLUMNS.items()):
+        failed = sum(1 for raw, value in zip(columns[header], parsed[name]) if value is None and raw not in ("", "-"))
+        if failed:
+            errors[name] = failed
+
+    rows = [
+        DividendRow(*values)
+        for values in zip(columns["Nama"], parsed["amount"], parsed["ex_date"],
+                          parsed["cum_date"], parsed["recording_date"], parsed["payment_date"])
+        if values[0] and values[1] is not None and values[2] is not None
+    ]
+
+    if errors:
+        LOGGER.error(f"Skipped {len(table_rows) - len(rows)} of {len(table_rows)} rows, unparsable cells per column: {errors}")
+
+    return ParsedPage(rows, len(table_rows), errors)
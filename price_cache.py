@@ -0,0 +1,128 @@
+from datetime import date
+from pathlib  import Path
+from db_utils import chunked
+
+import logging
+import sqlite3
+import time
+
+
+LOGGER = logging.getLogger(__name__)
+
+_DEFAULT_CACHE_PATH = Path(".cache") / "yearly_close.sqlite"
+
+
+class PriceCacheMiss(LookupError):
+    """Raised in offline mode when a requested ticker-year is not cached."""
+
+
+class CachedPriceSource:
+    def __init__(self,
+                 source=None,
+                 path: str | Path = _DEFAULT_CACHE_PATH,
+                 max_entries: int = 50_000,
+                 max_age_days: float = 365,
+                 negative_ttl_days: float = 7,
+                 offline: bool = False):
+        """
+        On-disk SQLite cache of yearly mean close prices in front of a price source.
+
+        Only closed years are stored, since their mean close never changes. A ticker-year the
+        source confirms has no price data, by returning (None, 0) for it, is cached for
+        negative_ttl_days only, so a listing gap is retried now and then. Tickers the source
+        did not answer for at all (e.g. a throttled download) are not cached, and the next call
+        asks for them again.
+
+        Args:
+            source: Price source with a `yearly_mean_close(tickers, year)` method, used on cache misses.
+            path (str | Path): SQLite file location. Default is .cache/yearly_close.sqlite
+            max_entries (int): Entries kept after eviction, least recently used first out. Default is 50000
+            max_age_days (float): Entries fetched longer ago than this are evicted. Default is 365
+            negative_ttl_days (float): "No data" entries fetched longer ago than this are evicted. Default is 7
+            offline (bool): If True, never call the source and raise PriceCacheMiss on a miss. Default is False
+        """
+        self.source = source
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.negative_ttl_days = negative_ttl_days
+        self.offline = offline
+        self._conn = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS yearly_close ("
+                " ticker TEXT NOT NULL,"
+                " year INTEGER NOT NULL,"
+                " mean_close REAL,"
+                " row_count INTEGER NOT NULL,"
+                " fetched_at REAL NOT NULL,"
+                " last_used REAL NOT NULL,"
+                " PRIMARY KEY (ticker, year))"
+            )
+            self.evict()
+        return self._conn
+
+    def evict(self):
+        """
+        Drops entries older than max_age_days ("no data" entries older than negative_ttl_days),
+        then the least recently used ones beyond max_entries.
+        """
+        conn = self._connection()
+        now = time.time()
+        with conn:
+            expired = conn.execute("DELETE FROM yearly_close WHERE fetched_at < ? OR (row_count = 0 AND fetched_at < ?)",
+                                   (now - self.max_age_days * 86400, now - self.negative_ttl_days * 86400)).rowcount
+            overflow = conn.execute("DELETE FROM yearly_close WHERE rowid IN "
+                                    "(SELECT rowid FROM yearly_close ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                                    (self.max_entries,)).rowcount
+        if expired or overflow:
+            LOGGER.info(f"Evicted {expired} expired and {overflow} least recently used price cache entries")
+
+    def _lookup(self, tickers: list[str], year: int) -> dict[str, tuple[float | None, int]]:
+        conn = self._connection()
+        cached = {}
+        with conn:
+            for batch in chunked(tickers, 500):
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(f"SELECT ticker, mean_close, row_count FROM yearly_close "
+                                    f"WHERE year = ? AND ticker IN ({placeholders})", (year, *batch)).fetchall()
+                cached.update((ticker, (mean_close, row_count)) for ticker, mean_close, row_count in rows)
+                conn.execute(f"UPDATE yearly_close SET last_used = ? WHERE year = ? AND ticker IN ({placeholders})",
+                             (time.time(), year, *batch))
+        return cached
+
+    def _store(self, year: int, fetched: dict[str, tuple[float | None, int]]):
+        now = time.time()
+        rows = [(ticker, year, mean_close, row_count, now, now) for ticker, (mean_close, row_count) in fetched.items()]
+        conn = self._connection()
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO yearly_close VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def yearly_mean_close(self, tickers: list[str], year: int) -> dict[str, tuple[float, int]]:
+        """
+        Returns {ticker: (mean close, number of trading days)}, downloading only uncached ticker-years.
+        """
+        tickers = sorted(set(tickers))
+        cached = self._lookup(tickers, year)
+        missing = [ticker for ticker in tickers if ticker not in cached]
+        LOGGER.info(f"Price cache for {year}: {len(cached)} hit(s), {len(missing)} miss(es)")
+
+        if missing:
+            if self.offline or self.source is None:
+                raise PriceCacheMiss(f"{len(missing)} ticker(s) not cached for {year}: {', '.join(missing[:10])}")
+
+            fetched = self.source.yearly_mean_close(missing, year)
+            if year < date.today().year:
+                self._store(year, fetched)
+            cached.update(fetched)
+
+        return {ticker: (mean_close, row_count) for ticker, (mean_close, row_count) in cached.items() if row_count}
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,58 @@
+from db_utils import chunked
+
+import logging
+import pandas as pd
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+class YahooPriceSource:
+    def __init__(self, batch_size: int = 50):
+        """
+        Yearly close-price statistics downloaded from Yahoo Finance in multi-ticker batches.
+
+        Args:
+            batch_size (int): Number of tickers per yf.download call. Default is 50
+        """
+        self.batch_size = batch_size
+
+    def yearly_mean_close(self, tickers: list[str], year: int) -> dict[str, tuple[float, int]]:
+        """
+        Returns {ticker: (mean close, number of trading days)} for the given year.
+
+        A ticker gets (None, 0) only when its batch downloaded prices for other tickers but none
+        for it, i.e. Yahoo confirmed it has no data. yf.download does not raise when it is rate
+        limited or offline, it returns an empty or all-NaN frame; those batches are left out, so
+        the caller can tell "no data" from "no answer".
+        """
+        # yfinance is only needed by the yearly yield update, so it is imported on first use
+        import yfinance as yf
+
+        result = {}
+        for batch in chunked(sorted(set(tickers)), self.batch_size):
+            LOGGER.info(f"Downloading {year} prices for {len(batch)} tickers")
+            prices = yf.download(batch,
+                                 start=f"{year}-01-01",
+                                 end=f"{year}-12-31",
+                                 auto_adjust=False,
+                                 progress=False)
+            if prices.empty:
+                continue
+
+            close = prices["Close"]
+            if isinstance(close, pd.Series):
+                close = close.to_frame(batch[0])
+
+            means, counts = close.mean(), close.count()
+            if not counts.any():
+                LOGGER.warning(f"No {year} prices returned for a batch of {len(batch)} tickers, leaving them out")
+                continue
+
+            for ticker in batch:
+                if ticker in counts.index and counts[ticker] > 0:
+                    result[ticker] = (float(means[ticker]), int(counts[ticker]))
+                else:
+                    result[ticker] = (None, 0)
+
+        return result
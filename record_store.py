@@ -0,0 +1,246 @@
+"""
+Columnar storage and Parquet archive of scraped dividend records.
+
+RecordStore is the archive path only: the crawl keeps retrieved_records as dicts, because
+the Supabase client takes JSON rows, and archive_run() packs them into a store when it
+writes records/archive/<table>. BackfillDiff is the one place holding both, and there the
+dicts are only the pending insert chunk, at most insert_chunk_size records.
+"""
+from array    import array
+from datetime import date, datetime, timedelta
+from pathlib  import Path
+
+import logging
+import pandas as pd
+
+
+LOGGER = logging.getLogger(__name__)
+
+_ARCHIVE_DIR = Path("records") / "archive"
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+_EPOCH = datetime(1970, 1, 1)
+# Stored for missing dates and timestamps; it is also numpy's NaT, so views read it as missing
+_NULL = -(2 ** 63)
+
+# Column kinds: "symbol" is dictionary encoded, "date" is days and "timestamp" seconds since the epoch
+DIVIDEND_SCHEMA = {
+    "symbol": "symbol",
+    "date": "date",
+    "dividend": "float",
+    "dividend_original": "float",
+    "cum_date": "date",
+    "recording_date": "date",
+    "payment_date": "date",
+    "updated_on": "timestamp",
+}
+
+UPCOMING_DIVIDEND_SCHEMA = {
+    "symbol": "symbol",
+    "ex_date": "date",
+    "dividend_amount": "float",
+    "cum_date": "date",
+    "recording_date": "date",
+    "payment_date": "date",
+    "updated_on": "timestamp",
+}
+
+_TYPECODES = {"symbol": "i", "date": "q", "float": "d", "timestamp": "q"}
+
+
+def _to_days(value) -> int:
+    if not value:
+        return _NULL
+    if isinstance(value, str):
+        # Old snapshots hold site dates such as "08-Aug-2024"
+        value = date.fromisoformat(value) if value[4:5] == "-" else datetime.strptime(value, "%d-%b-%Y").date()
+    return value.toordinal() - _EPOCH_ORDINAL
+
+
+def _from_days(value: int) -> str | None:
+    return None if value == _NULL else date.fromordinal(value + _EPOCH_ORDINAL).isoformat()
+
+
+def _to_seconds(value) -> int:
+    if not value:
+        return _NULL
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return int((value.replace(tzinfo=None) - _EPOCH).total_seconds())
+
+
+def _from_seconds(value: int) -> str | None:
+    return None if value == _NULL else (_EPOCH + timedelta(seconds=value)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+class RecordStore:
+    def __init__(self, schema: dict[str, str] = DIVIDEND_SCHEMA):
+        """
+        Columnar container for scraped dividend records.
+
+        Every column is one typed array (array.array), so a record costs a few bytes per
+        field instead of a dict with repeated string keys. Symbols are dictionary encoded,
+        dates are kept as days and timestamps as seconds since the epoch. Missing values
+        become None on the way out, NaN for floats.
+
+        to_pandas() and to_arrow() are built on numpy views of the arrays rather than on
+        per-record objects; float, symbol code and timestamp columns are not copied at all.
+        While such a view is alive the arrays cannot grow, so append() raises BufferError.
+
+        Args:
+            schema (dict[str, str]): Column name -> kind ("symbol", "date", "float" or "timestamp").
+                Default is the idx_dividend record shape.
+        """
+        self.schema = dict(schema)
+        self.columns = {name: array(_TYPECODES[kind]) for name, kind in self.schema.items()}
+        self.symbols: list[str] = []
+        self._symbol_codes: dict[str, int] = {}
+
+    def append(self, record: dict):
+        for name, kind in self.schema.items():
+            value = record.get(name)
+            if kind == "symbol":
+                code = self._symbol_codes.get(value)
+                if code is None:
+                    code = self._symbol_codes[value] = len(self.symbols)
+                    self.symbols.append(value)
+                self.columns[name].append(code)
+            elif kind == "date":
+                self.columns[name].append(_to_days(value))
+            elif kind == "timestamp":
+                self.columns[name].append(_to_seconds(value))
+            else:
+                self.columns[name].append(float("nan") if value is None or value == "" else float(value))
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    def __len__(self) -> int:
+        return len(next(iter(self.columns.values()), ()))
+
+    def __iter__(self):
+        """
+        Yields the records back as dicts, in the shape they were added.
+        """
+        decoders = {
+            "symbol": self.symbols.__getitem__,
+            "date": _from_days,
+            "timestamp": _from_seconds,
+            "float": lambda value: None if value != value else value,
+        }
+        names = list(self.schema)
+        columns = [map(decoders[self.schema[name]], self.columns[name]) for name in names]
+        for values in zip(*columns):
+            yield dict(zip(names, values))
+
+    def _numpy_column(self, name: str):
+        import numpy as np
+
+        kind = self.schema[name]
+        values = np.frombuffer(self.columns[name], dtype=self.columns[name].typecode)
+        if kind == "date":
+            return values.view("datetime64[D]")
+        if kind == "timestamp":
+            return values.view("datetime64[s]")
+        return values
+
+    def to_pandas(self) -> pd.DataFrame:
+        """
+        DataFrame view of the store: symbols as a categorical, dates and timestamps as datetime64.
+        """
+        data = {}
+        for name, kind in self.schema.items():
+            if kind == "symbol":
+                data[name] = pd.Categorical.from_codes(self._numpy_column(name), categories=self.symbols)
+            else:
+                data[name] = self._numpy_column(name)
+        return pd.DataFrame(data, copy=False)
+
+    def to_arrow(self):
+        """
+        pyarrow Table of the store, with dictionary-encoded symbols and date32 date columns.
+        Missing values of every column, NaN floats included, are nulls. Needs the optional
+        pyarrow dependency.
+        """
+        import numpy as np
+        import pyarrow as pa
+
+        arrays = {}
+        for name, kind in self.schema.items():
+            values = self._numpy_column(name)
+            if kind == "symbol":
+                arrays[name] = pa.DictionaryArray.from_arrays(pa.array(values), pa.array(self.symbols, pa.string()))
+            elif kind == "date":
+                arrays[name] = pa.array(values, mask=values.view("int64") == _NULL, type=pa.date32())
+            elif kind == "timestamp":
+                arrays[name] = pa.array(values, mask=values.view("int64") == _NULL)
+            else:
+                arrays[name] = pa.array(values, mask=np.isnan(values))
+        return pa.table(arrays)
+
+    def write_parquet(self, root: str | Path, run_date: str) -> Path:
+        """
+        Writes the store to the Parquet archive under root, partitioned by run_date
+        (root/run_date=YYYY-MM-DD/). Rerunning the same day replaces that day's partition.
+
+        Args:
+            root (str | Path): Archive directory of one table, e.g. records/archive/idx_dividend.
+            run_date (str): Date of the run, "YYYY-MM-DD".
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = self.to_arrow()
+        table = table.append_column("run_date", pa.array([run_date] * len(table), pa.string()))
+        pq.write_to_dataset(table,
+                            root_path=str(root),
+                            partition_cols=["run_date"],
+                            basename_template="part-{i}.parquet",
+                            existing_data_behavior="delete_matching")
+        return Path(root) / f"run_date={run_date}"
+
+    @classmethod
+    def from_csv(cls, path: str | Path, schema: dict[str, str] = DIVIDEND_SCHEMA) -> "RecordStore":
+        """
+        Loads an old CSV snapshot, such as records/retrieved_records_*.csv, whatever its date format.
+        Columns the schema does not know are dropped, missing ones are left empty.
+        """
+        store = cls(schema)
+        frame = pd.read_csv(path, dtype=str, keep_default_na=False)
+        store.extend(frame.to_dict(orient="records"))
+        return store
+
+
+def read_archive(root: str | Path, since: str | None = None, columns: list[str] | None = None) -> pd.DataFrame:
+    """
+    Loads archived runs of one table, only reading the run_date partitions from since onwards.
+
+    Args:
+        root (str | Path): Archive directory of one table, e.g. records/archive/idx_dividend.
+        since (str | None): Oldest run date to load, "YYYY-MM-DD". Default loads every run.
+        columns (list[str] | None): Columns to read. Default reads all of them.
+    """
+    import pyarrow.parquet as pq
+
+    filters = [("run_date", ">=", since)] if since else None
+    table = pq.read_table(root, columns=columns, filters=filters)
+    return table.to_pandas(date_as_object=False)
+
+
+def archive_path(table_name: str) -> Path:
+    return _ARCHIVE_DIR / table_name
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert old CSV snapshots of idx_dividend into the Parquet archive")
+    parser.add_argument("csv_files", nargs="+", type=Path)
+    parser.add_argument("--table", default="idx_dividend")
+    args = parser.parse_args()
+
+    for csv_file in args.csv_files:
+        store = RecordStore.from_csv(csv_file)
+        run_date = max(record["updated_on"] for record in store)[:10]
+        print(f"{csv_file}: {len(store)} records -> {store.write_parquet(archive_path(args.table), run_date)}")
@@ -0,0 +1,175 @@
+from collections import Counter
+from contextlib  import contextmanager
+from pathlib     import Path
+
+import cProfile
+import json
+import logging
+import os
+import pstats
+import threading
+import time
+
+
+LOGGER = logging.getLogger(__name__)
+
+_DEFAULT_REPORT_DIR = Path(".cache") / "reports"
+
+
+class RunMetrics:
+    def __init__(self,
+                 name: str = "run",
+                 report_dir: str | Path = _DEFAULT_REPORT_DIR,
+                 log_every: int = 0,
+                 profile: bool = False,
+                 profile_thread: bool = True):
+        """
+        Per-stage timers and counters of one scraper run, written as a compact JSON report.
+
+        Stages are timed in seconds of wall time (fetch, parse, filter, db_read, db_write);
+        counters hold pages, rows, skips, retries and DB calls. Timers and counters are
+        thread-safe, so background writers and prefetch threads can report into them.
+
+        Args:
+            name (str): Run name, used for the report and profile file names. Default is run
+            report_dir (str | Path): Directory of the JSON report and the profile. Default is .cache/reports
+            log_every (int): Log one in log_every per-record events at DEBUG, 0 disables them. Default is 0
+            profile (bool): If True, the run is profiled with cProfile and the stats are saved
+                next to the report. Default is False
+            profile_thread (bool): If True, profiling starts right away on the calling thread. Runs whose
+                work happens on worker threads pass False and wrap that work in profiled(). Default is True
+        """
+        self.name = name
+        self.report_dir = Path(report_dir)
+        self.log_every = log_every
+        self.timings: dict[str, float] = {}
+        self.counters: Counter = Counter()
+
+        self._events: Counter = Counter()
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self.profile = profile
+        self._profiles: list[cProfile.Profile] = []
+        self._profile_stats: pstats.Stats | None = None
+        self._profiler = cProfile.Profile() if profile and profile_thread else None
+        if self._profiler:
+            self._profiler.enable()
+
+    @classmethod
+    def from_env(cls, name: str, profile_thread: bool = True) -> "RunMetrics":
+        """
+        Builds the metrics of a scheduled run from RECORD_LOG_EVERY and PROFILE_RUN ("1" to profile).
+        """
+        return cls(name,
+                   log_every=int(os.getenv("RECORD_LOG_EVERY", "0")),
+                   profile=os.getenv("PROFILE_RUN") == "1",
+                   profile_thread=profile_thread)
+
+    @contextmanager
+    def profiled(self):
+        """
+        Profiles the enclosed code on the current thread, when profiling is on. cProfile only sees
+        the thread that enabled it, so work handed to worker threads is wrapped in this there.
+        The stats of every profiled block are merged into the run's profile.
+        """
+        if not self.profile:
+            yield
+            return
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError as error:
+            # Python 3.12+ allows a single active profiler per interpreter
+            LOGGER.debug(f"Not profiling this block of {self.name}: {error}")
+            yield
+            return
+
+        try:
+            yield
+        finally:
+            profiler.disable()
+            with self._lock:
+                self._profiles.append(profiler)
+
+    @contextmanager
+    def timer(self, stage: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.timings[stage] = self.timings.get(stage, 0.0) + elapsed
+
+    def timed(self, iterable, stage: str):
+        """
+        Yields from iterable, adding the time spent waiting for every item to stage.
+        """
+        iterator = iter(iterable)
+        while True:
+            with self.timer(stage):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def count(self, counter: str, value: int = 1):
+        with self._lock:
+            self.counters[counter] += value
+
+    def sampled(self, event: str) -> bool:
+        """
+        True for one in log_every occurrences of event, so per-record logs can be thinned out.
+        """
+        if not self.log_every:
+            return False
+        with self._lock:
+            self._events[event] += 1
+            return (self._events[event] - 1) % self.log_every == 0
+
+    def report(self) -> dict:
+        return {
+            "name": self.name,
+            "seconds": round(time.monotonic() - self._started, 3),
+            "timings": {stage: round(seconds, 3) for stage, seconds in sorted(self.timings.items())},
+            "counters": dict(sorted(self.counters.items())),
+        }
+
+    def write_report(self, **extra) -> Path:
+        """
+        Writes the report (plus any extra fields) to <report_dir>/<name>.json and, when profiling,
+        the cProfile stats to <report_dir>/<name>.prof. Returns the report path.
+        """
+        report = {**self.report(), **extra}
+        self.report_dir.mkdir(parents=True, exist_ok=True)
+        path = self.report_dir / f"{self.name}.json"
+        tmp_path = path.with_suffix(".json.tmp")
+        tmp_path.write_text(json.dumps(report, separators=(",", ":")))
+        os.replace(tmp_path, path)
+
+        if self._profiler:
+            self._profiler.disable()
+            self._profiles.append(self._profiler)
+            self._profiler = None
+        if self._merge_profiles():
+            self._profile_stats.dump_stats(self.report_dir / f"{self.name}.prof")
+
+        return path
+
+    def _merge_profiles(self) -> bool:
+        """
+        Folds the finished profiles into the run's stats. Returns False if nothing was profiled.
+        """
+        with self._lock:
+            profiles, self._profiles = self._profiles, []
+        for profiler in profiles:
+            profiler.create_stats()
+            if not profiler.stats:
+                continue
+            if self._profile_stats is None:
+                self._profile_stats = pstats.Stats(profiler)
+            else:
+                self._profile_stats.add(profiler)
+        return self._profile_stats is not None
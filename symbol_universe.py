@@ -0,0 +1,118 @@
+from pathlib  import Path
+from db_utils import select_paginated
+
+import json
+import logging
+import os
+import time
+
+
+LOGGER = logging.getLogger(__name__)
+
+_DEFAULT_CACHE_PATH = Path(".cache") / "allowed_symbols.json"
+
+
+class SymbolUniverse:
+    def __init__(self,
+                 supabase_client=None,
+                 path: str | Path = _DEFAULT_CACHE_PATH,
+                 ttl: float = 86400,
+                 refresh_on_miss: bool = True):
+        """
+        Set of IDX symbols (without the .JK suffix) the scrapers keep, loaded on first use.
+
+        The universe comes from idx_company_profile through paginated selects and is cached
+        on disk for ttl seconds. A symbol missing from a cached universe triggers one refresh
+        from the database per instance, so newly listed companies are picked up the same day.
+        Symbols still missing after that are remembered in the cache file until it expires,
+        so a listed ticker without a company profile does not reload the table on every run.
+
+        Args:
+            supabase_client (Client): Supabase client instance, only needed when the cache is stale.
+            path (str | Path): Cache file location. Default is .cache/allowed_symbols.json
+            ttl (float): Seconds the cached universe is used without asking the database. Default is 86400
+            refresh_on_miss (bool): If True, a lookup miss reloads a cached universe once. Default is True
+        """
+        self.supabase_client = supabase_client
+        self.path = Path(path)
+        self.ttl = ttl
+        self.refresh_on_miss = refresh_on_miss
+        self.db_calls = 0
+        self._symbols: frozenset[str] | None = None
+        self._misses: set[str] = set()
+        self._loaded_at = 0.0
+        self._from_db = False
+
+    @property
+    def symbols(self) -> frozenset[str]:
+        if self._symbols is None:
+            self._symbols = self._read_cache()
+            if self._symbols is None:
+                self.refresh()
+        return self._symbols
+
+    def _read_cache(self) -> frozenset[str] | None:
+        try:
+            loaded_at = self.path.stat().st_mtime
+            if time.time() - loaded_at > self.ttl:
+                return None
+            state = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return None
+
+        # Caches written before misses were remembered hold the bare symbol list
+        if isinstance(state, list):
+            state = {"symbols": state}
+        self._misses = set(state.get("misses", ()))
+        self._loaded_at = loaded_at
+        return frozenset(state["symbols"])
+
+    def _write_cache(self):
+        """
+        Rewrites the cache, keeping the time the universe was loaded as its mtime so the TTL still counts from it.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp_path.write_text(json.dumps({"symbols": sorted(self._symbols), "misses": sorted(self._misses)}))
+        os.utime(tmp_path, (self._loaded_at, self._loaded_at))
+        os.replace(tmp_path, self.path)
+
+    def refresh(self):
+        """
+        Reloads the universe from idx_company_profile and rewrites the cache.
+        """
+        def build_query():
+            return self.supabase_client.from_("idx_company_profile").select("symbol").order("symbol")
+
+        symbols = set()
+        for rows in select_paginated(build_query):
+            self.db_calls += 1
+            symbols.update(row["symbol"][:4] for row in rows)
+
+        self._symbols = frozenset(symbols)
+        self._misses = set()
+        self._loaded_at = time.time()
+        self._from_db = True
+        LOGGER.info(f"Loaded {len(self._symbols)} symbols from idx_company_profile")
+        self._write_cache()
+
+    def __contains__(self, symbol: str) -> bool:
+        if symbol in self.symbols:
+            return True
+        if symbol in self._misses:
+            return False
+        if self.refresh_on_miss and not self._from_db and self.supabase_client is not None:
+            LOGGER.info(f"Symbol {symbol} not in cached universe, refreshing it")
+            self.refresh()
+            if symbol in self._symbols:
+                return True
+
+        self._misses.add(symbol)
+        self._write_cache()
+        return False
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def __iter__(self):
+        return iter(self.symbols)
@@ -0,0 +1,47 @@
+from datetime import date
+from pathlib  import Path
+
+import pytest
+import sys
+
+_ROOT = Path(__file__).resolve().parent.parent
+
+# The scrapers are top-level modules, the offline stand-ins live with the benchmarks
+sys.path.insert(0, str(_ROOT))
+sys.path.insert(0, str(_ROOT / "benchmarks"))
+
+from offline     import FakeSupabase, FixtureServer, recorded_listing  # noqa: E402
+from page_parser import parse_dividend_page  # noqa: E402
+
+_LISTING_PAGES = 10
+
+
+@pytest.fixture
+def today() -> date:
+    # The recorded page holds ex-dates from 13-Sep-2024 to 29-Sep-2024, later pages go back from there
+    return date(2024, 9, 20)
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    """
+    Fixture server replaying the recorded listing. Checkpoints, watermarks and caches are
+    written under .cache/ of the working directory, so the test runs in tmp_path.
+    """
+    monkeypatch.chdir(tmp_path)
+    server = FixtureServer(recorded_listing(_LISTING_PAGES))
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def listing_rows(server) -> list:
+    return [row for html in server.pages for row in parse_dividend_page(html).rows]
+
+
+@pytest.fixture
+def supabase(listing_rows) -> FakeSupabase:
+    """
+    In-memory Supabase whose idx_company_profile holds every symbol of the listing.
+    """
+    return FakeSupabase({"idx_company_profile": [{"symbol": symbol} for symbol in sorted({row.symbol for row in listing_rows})]})
@@ -0,0 +1,37 @@
+import threading
+import time
+
+from batch_writer import MicroBatchWriter
+
+
+def test_buffered_records_are_flushed_while_no_record_arrives():
+    written = threading.Event()
+    writer = MicroBatchWriter(lambda batch: written.set(), batch_size=100, flush_interval=0.1)
+
+    writer.add({"symbol": "BBCA.JK"})
+    # The crawl stalls: nothing else is added, yet the record is sent after flush_interval
+    assert written.wait(2)
+    writer.close()
+    assert writer.written == 1
+
+
+def test_acknowledged_only_counts_leading_written_records():
+    release_first = threading.Event()
+
+    def write(batch):
+        if batch[0]["n"] == 0:
+            release_first.wait(2)
+
+    writer = MicroBatchWriter(write, batch_size=2, flush_interval=60, max_in_flight=2)
+    for n in range(4):
+        writer.add({"n": n})
+
+    # The second batch is written before the first, which is still in flight
+    deadline = time.monotonic() + 2
+    while writer.written < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert writer.acknowledged == 0
+
+    release_first.set()
+    writer.close()
+    assert writer.acknowledged == 4
@@ -0,0 +1,59 @@
+from datetime import date
+
+import pytest
+
+import future_dividend_checker
+from future_dividend_checker import FutureDividendChecker
+from offline                 import FakeSupabase
+
+
+_TODAY = date(2024, 9, 20)
+
+
+def _row(symbol: str, ex_date: str, amount, payment_date: str = "2024-10-10") -> dict:
+    return {"symbol": symbol, "ex_date": ex_date, "dividend_amount": amount,
+            "cum_date": None, "recording_date": None, "payment_date": payment_date}
+
+
+@pytest.fixture
+def checker(monkeypatch):
+    monkeypatch.setattr(future_dividend_checker, "_LOCAL_TODAY", _TODAY)
+    supabase = FakeSupabase({"idx_upcoming_dividend": [
+        _row("BBCA.JK", "2024-09-25", 135.0),
+        _row("BMRI.JK", "2024-09-26", 200.0),
+        # numeric columns can come back as strings
+        _row("TLKM.JK", "2024-09-27", "80.50"),
+        _row("ASII.JK", "2024-08-01", 98.0, payment_date="2024-08-20"),
+    ]})
+    checker = FutureDividendChecker(supabase)
+    checker.retrieved_records = [
+        {**_row("BBCA.JK", "2024-09-25", 135.0), "updated_on": "2024-09-20 00:00:00"},
+        {**_row("BMRI.JK", "2024-09-26", 210.0), "updated_on": "2024-09-20 00:00:00"},
+        {**_row("TLKM.JK", "2024-09-27", 80.5), "updated_on": "2024-09-20 00:00:00"},
+        {**_row("UNVR.JK", "2024-09-30", 60.0), "updated_on": "2024-09-20 00:00:00"},
+    ]
+    return checker
+
+
+def test_diff_against_db_classifies_every_row(checker):
+    changes = checker.diff_against_db(retention_period=14)
+
+    assert [record["symbol"] for record in changes.inserted] == ["UNVR.JK"]
+    assert [record["symbol"] for record in changes.updated] == ["BMRI.JK"]
+    assert changes.unchanged == 2
+    assert [row["symbol"] for row in changes.deleted] == ["ASII.JK"]
+    assert changes.deletion_date == "2024-09-06"
+    # Nothing is written by the diff
+    assert checker.supabase_client.calls[("idx_upcoming_dividend", "upsert")] == 0
+
+
+def test_upsert_to_db_writes_only_the_changes_and_sweeps_retention(checker):
+    checker.upsert_to_db(retention_period=14)
+
+    stored = {row["symbol"]: row for row in checker.supabase_client.tables["idx_upcoming_dividend"]}
+    assert set(stored) == {"BBCA.JK", "BMRI.JK", "TLKM.JK", "UNVR.JK"}
+    assert stored["BMRI.JK"]["dividend_amount"] == 210.0
+    # The unchanged rows were not rewritten
+    assert "updated_on" not in stored["BBCA.JK"] and "updated_on" not in stored["TLKM.JK"]
+    assert checker.supabase_client.calls[("idx_upcoming_dividend", "upsert")] == 1
+    assert checker.supabase_client.calls[("idx_upcoming_dividend", "delete")] == 1
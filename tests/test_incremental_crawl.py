@@ -0,0 +1,71 @@
+from contextlib import closing
+from datetime   import date, timedelta
+
+from dividend_checker import DividendChecker
+from fetcher          import PageFetcher
+from symbol_universe  import SymbolUniverse
+
+
+def _run(server, supabase, end_date: date) -> list[dict]:
+    """
+    One incremental daily run over the 30 days up to end_date. Returns the records it wrote.
+    """
+    fetcher = PageFetcher(server.url_template, rate=10000, burst=10000)
+    checker = DividendChecker(supabase,
+                              fetcher=fetcher,
+                              allowed_symbols=SymbolUniverse(supabase, path=".cache/symbols.json"))
+    checker.start_date = (end_date - timedelta(days=29)).isoformat()
+    checker.end_date = end_date.isoformat()
+    with closing(fetcher):
+        checker.get_dividend_records(include_payment_date=True, incremental=True)
+        try:
+            checker.upsert_to_db()
+        except SystemExit:
+            pass
+    return checker.retrieved_records
+
+
+def test_shifted_window_picks_up_rows_that_entered_it(server, listing_rows, supabase, today):
+    first = _run(server, supabase, today)
+    assert first
+    assert max(record["date"] for record in first) <= today.isoformat()
+
+    # Same listing, window moved five days forward
+    second_end = today + timedelta(days=5)
+    second = _run(server, supabase, second_end)
+
+    entered = {(row.symbol + ".JK", row.ex_date) for row in listing_rows
+               if today.isoformat() < row.ex_date <= second_end.isoformat() and row.payment_date}
+    assert entered
+    assert {(record["symbol"], record["date"]) for record in second} == entered
+
+
+def test_same_window_stops_at_the_first_unchanged_page(server, supabase, today):
+    _run(server, supabase, today)
+    hits_before = server.hits
+    assert _run(server, supabase, today) == []
+    assert server.hits - hits_before == 1
+
+
+def test_upcoming_window_picks_up_the_day_that_entered_it(server, listing_rows, supabase, monkeypatch):
+    import future_dividend_checker
+    from future_dividend_checker import FutureDividendChecker
+
+    def run(today: date) -> list[dict]:
+        monkeypatch.setattr(future_dividend_checker, "_LOCAL_TODAY", today)
+        fetcher = PageFetcher(server.url_template, rate=10000, burst=10000)
+        checker = FutureDividendChecker(supabase,
+                                        fetcher=fetcher,
+                                        allowed_symbols=SymbolUniverse(supabase, path=".cache/symbols.json"))
+        checker.start_date = today.isoformat()
+        checker.end_date = (today + timedelta(days=14)).isoformat()
+        with closing(fetcher):
+            checker.get_dividend_records(incremental=True)
+            checker.upsert_to_db()
+        return checker.retrieved_records
+
+    run(date(2024, 9, 10))
+    second = run(date(2024, 9, 11))
+
+    assert {(record["symbol"], record["ex_date"]) for record in second} == \
+           {(row.symbol + ".JK", row.ex_date) for row in listing_rows if row.ex_date == "2024-09-25" and row.payment_date}
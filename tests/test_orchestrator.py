@@ -0,0 +1,74 @@
+from datetime import timedelta
+
+import asyncio
+import json
+import pstats
+
+import future_dividend_checker
+from fetcher         import PageFetcher
+from orchestrator    import Orchestrator
+from symbol_universe import SymbolUniverse
+
+
+def _orchestrator(server, supabase, today, monkeypatch, **kwargs) -> Orchestrator:
+    monkeypatch.setattr(future_dividend_checker, "_LOCAL_TODAY", today)
+    orchestrator = Orchestrator(supabase, **kwargs)
+    orchestrator.fetcher = PageFetcher(server.url_template, rate=10000, burst=10000)
+    orchestrator.allowed_symbols = SymbolUniverse(supabase, path=".cache/symbols.json")
+
+    build_checker = orchestrator._checker
+
+    def pinned_checker(checker_class, name):
+        checker = build_checker(checker_class, name)
+        if name == "upcoming":
+            checker.start_date, checker.end_date = today.isoformat(), (today + timedelta(days=14)).isoformat()
+        else:
+            checker.start_date, checker.end_date = (today - timedelta(days=29)).isoformat(), today.isoformat()
+        return checker
+
+    orchestrator._checker = pinned_checker
+    return orchestrator
+
+
+def test_daily_and_upcoming_share_one_crawl(server, supabase, today, monkeypatch):
+    orchestrator = _orchestrator(server, supabase, today, monkeypatch)
+    results = asyncio.run(orchestrator.run(("daily", "upcoming")))
+
+    assert all(result.ok for result in results), results
+    assert supabase.tables["idx_dividend"]
+    assert supabase.tables["idx_upcoming_dividend"]
+    # One pass: pages are requested once, however many jobs read them, plus at most the prefetched ones
+    assert server.hits <= orchestrator.crawl_metrics.counters["pages"] + orchestrator.fetcher.prefetch
+
+
+def test_job_metrics_follow_the_environment_and_profile_worker_threads(server, supabase, today, monkeypatch):
+    monkeypatch.setenv("RECORD_LOG_EVERY", "10")
+    monkeypatch.setenv("PROFILE_RUN", "1")
+    orchestrator = _orchestrator(server, supabase, today, monkeypatch)
+    results = asyncio.run(orchestrator.run(("daily", "upcoming")))
+    assert all(result.ok for result in results), results
+
+    assert orchestrator._checkers["daily"].metrics.log_every == 10
+    # The stages ran on worker threads, and their calls are in the job's profile
+    functions = {name for _, _, name in pstats.Stats(".cache/reports/daily.prof").stats}
+    assert "upsert_to_db" in functions
+    functions = {name for _, _, name in pstats.Stats(".cache/reports/crawl.prof").stats}
+    assert "parse_dividend_page" in functions
+
+    # The shared symbol universe is loaded once and reported once, with the crawl
+    reports = {name: json.load(open(f".cache/reports/{name}.json")) for name in ("crawl", "daily", "upcoming")}
+    assert reports["crawl"]["counters"]["db_calls"] == orchestrator.allowed_symbols.db_calls > 0
+    assert reports["daily"]["counters"]["db_calls"] == orchestrator._checkers["daily"].db_calls
+
+
+def test_backfill_rides_on_the_daily_crawl(server, listing_rows, supabase, today, monkeypatch):
+    cutoff = (today - timedelta(days=90)).isoformat()
+    backfill_keys = {(row.symbol + ".JK", row.ex_date) for row in listing_rows if cutoff <= row.ex_date <= today.isoformat()}
+    orchestrator = _orchestrator(server, supabase, today, monkeypatch, backfill_cutoff=cutoff)
+    results = asyncio.run(orchestrator.run(("daily", "upcoming")))
+
+    assert all(result.ok for result in results), results
+    assert "backfilled" in results[0].detail
+    assert backfill_keys <= {(row["symbol"], row["date"]) for row in supabase.tables["idx_dividend"]}
+    # Still a single pass, down to the backfill cutoff
+    assert server.hits <= orchestrator.crawl_metrics.counters["pages"] + orchestrator.fetcher.prefetch
@@ -0,0 +1,78 @@
+from contextlib import closing
+
+import math
+import pytest
+
+from fetcher      import PageFetcher
+from offline      import FixtureServer, recorded_listing
+from page_locator import PageLocator
+from page_parser  import parse_dividend_page
+
+
+_LISTING_PAGES = 64
+
+
+@pytest.fixture(scope="module")
+def long_listing():
+    pages = recorded_listing(_LISTING_PAGES)
+    server = FixtureServer(pages)
+    yield server, {page: parse_dividend_page(html).rows for page, html in enumerate(pages, start=1)}
+    server.close()
+
+
+def _expected_pages(rows_by_page: dict, start_date: str, end_date: str) -> list[int]:
+    return [page for page, rows in rows_by_page.items() if any(start_date <= row.ex_date <= end_date for row in rows)]
+
+
+@pytest.mark.parametrize("start_date, end_date", [
+    ("2023-03-01", "2023-06-30"),   # middle of the listing
+    ("2024-09-20", "2024-12-31"),   # page 1
+    ("2010-01-01", "2010-12-31"),   # older than the last page
+])
+def test_locate_finds_the_pages_of_the_window(long_listing, start_date, end_date):
+    server, rows_by_page = long_listing
+    with closing(PageFetcher(server.url_template, rate=10000, burst=10000)) as fetcher:
+        locator = PageLocator(fetcher)
+        pages = locator.locate(start_date, end_date)
+
+        assert list(pages) == _expected_pages(rows_by_page, start_date, end_date)
+        assert bool(pages) == (start_date > "2011-01-01")
+        # Gallop plus two bisections over the galloped range
+        assert locator.probes <= 3 * math.ceil(math.log2(_LISTING_PAGES * 2)) + 1
+
+        rows = list(locator.iter_rows(pages, shards=4))
+    assert rows == [row for page in pages for row in rows_by_page[page]]
+
+
+def test_iter_rows_only_fetches_pages_not_probed(long_listing):
+    server, _ = long_listing
+    with closing(PageFetcher(server.url_template, rate=10000, burst=10000)) as fetcher:
+        locator = PageLocator(fetcher)
+        pages = locator.locate("2023-03-01", "2023-06-30")
+        probed = set(locator._pages)
+        hits_before = server.hits
+        list(locator.iter_rows(pages))
+    assert server.hits - hits_before == len(set(pages) - probed)
+
+
+def test_backfill_window_inserts_only_missing_rows(long_listing, tmp_path, monkeypatch):
+    from dividend_checker import DividendChecker
+    from offline          import FakeSupabase
+    from symbol_universe  import SymbolUniverse
+
+    monkeypatch.chdir(tmp_path)
+    server, rows_by_page = long_listing
+    window_rows = {(row.symbol + ".JK", row.ex_date) for rows in rows_by_page.values() for row in rows
+                   if "2023-03-01" <= row.ex_date <= "2023-06-30"}
+    stored = sorted(window_rows)[::2]
+    supabase = FakeSupabase({
+        "idx_company_profile": [{"symbol": symbol} for symbol, _ in window_rows],
+        "idx_dividend": [{"symbol": symbol, "date": ex_date} for symbol, ex_date in stored],
+    })
+
+    with closing(PageFetcher(server.url_template, rate=10000, burst=10000)) as fetcher:
+        checker = DividendChecker(supabase, fetcher=fetcher, allowed_symbols=SymbolUniverse(supabase, path="symbols.json"))
+        inserted = checker.backfill_window("2023-03-01", "2023-06-30", shards=4)
+
+    assert inserted == len(window_rows) - len(stored)
+    assert {(row["symbol"], row["date"]) for row in supabase.tables["idx_dividend"]} == window_rows
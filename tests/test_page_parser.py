@@ -0,0 +1,37 @@
+from offline     import FIXTURES_DIR
+from page_parser import parse_dividend_page
+
+import re
+
+
+def _page_with_cell(header: str, value: str, row: int = 0) -> tuple[str, int]:
+    """
+    The recorded listing page with one cell of the given column replaced. Returns the page and its row count.
+    """
+    html = (FIXTURES_DIR / "deviden_page.html").read_text(encoding="utf-8")
+    cells = list(re.finditer(rf'(<td data-header="{header}">)(.*?)(</td>)', html, flags=re.S))
+    cell = cells[row]
+    return html[:cell.start(2)] + value + html[cell.end(2):], len(cells)
+
+
+def test_unparsable_amount_drops_the_row_and_is_counted():
+    html, row_count = _page_with_cell("Amount", "abc")
+    parsed = parse_dividend_page(html)
+
+    assert parsed.data_rows == row_count
+    assert len(parsed.rows) == row_count - 1
+    assert all(isinstance(row.amount, float) and row.amount == row.amount for row in parsed.rows)
+    assert parsed.errors == {"amount": 1}
+
+
+def test_unparsable_dates_drop_the_row_or_become_none():
+    html, row_count = _page_with_cell("Ex Date", "31-Foo-2024")
+    parsed = parse_dividend_page(html)
+    assert len(parsed.rows) == row_count - 1
+    assert parsed.errors == {"ex_date": 1}
+
+    html, _ = _page_with_cell("Payment Date", "not a date")
+    parsed = parse_dividend_page(html)
+    assert len(parsed.rows) == row_count
+    assert parsed.rows[0].payment_date is None
+    assert parsed.errors == {"payment_date": 1}
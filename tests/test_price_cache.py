@@ -0,0 +1,82 @@
+import pytest
+import time
+
+from price_cache import CachedPriceSource, PriceCacheMiss
+
+
+class ScriptedSource:
+    """
+    Price source answering each call with the next scripted response, and recording the tickers asked for.
+    """
+    def __init__(self, *responses: dict):
+        self.responses = list(responses)
+        self.requested: list[list[str]] = []
+
+    def yearly_mean_close(self, tickers, year):
+        self.requested.append(list(tickers))
+        return self.responses.pop(0)
+
+
+def _cache(tmp_path, source, **kwargs) -> CachedPriceSource:
+    return CachedPriceSource(source, path=tmp_path / "prices.sqlite", **kwargs)
+
+
+def test_cached_ticker_years_are_not_downloaded_again(tmp_path):
+    source = ScriptedSource({"BBCA.JK": (9000.0, 240)}, {"BMRI.JK": (6000.0, 238)})
+    cache = _cache(tmp_path, source)
+
+    assert cache.yearly_mean_close(["BBCA.JK"], 2023) == {"BBCA.JK": (9000.0, 240)}
+    assert cache.yearly_mean_close(["BBCA.JK", "BMRI.JK"], 2023) == {"BBCA.JK": (9000.0, 240), "BMRI.JK": (6000.0, 238)}
+    # Only the miss went to the source
+    assert source.requested == [["BBCA.JK"], ["BMRI.JK"]]
+
+
+def test_offline_miss_raises(tmp_path):
+    cache = _cache(tmp_path, ScriptedSource({"BBCA.JK": (9000.0, 240)}))
+    cache.yearly_mean_close(["BBCA.JK"], 2023)
+    cache.close()
+
+    offline = _cache(tmp_path, None, offline=True)
+    assert offline.yearly_mean_close(["BBCA.JK"], 2023) == {"BBCA.JK": (9000.0, 240)}
+    with pytest.raises(PriceCacheMiss):
+        offline.yearly_mean_close(["BMRI.JK"], 2023)
+
+
+def test_unanswered_tickers_are_retried(tmp_path):
+    # The first download was throttled and returned nothing
+    source = ScriptedSource({}, {"BBCA.JK": (9000.0, 240)})
+    cache = _cache(tmp_path, source)
+
+    assert cache.yearly_mean_close(["BBCA.JK"], 2023) == {}
+    assert cache.yearly_mean_close(["BBCA.JK"], 2023) == {"BBCA.JK": (9000.0, 240)}
+    assert len(source.requested) == 2
+
+
+def test_confirmed_no_data_is_cached_until_the_negative_ttl(tmp_path):
+    source = ScriptedSource({"GOTO.JK": (None, 0)}, {"GOTO.JK": (80.0, 120)})
+    cache = _cache(tmp_path, source, negative_ttl_days=7)
+
+    assert cache.yearly_mean_close(["GOTO.JK"], 2023) == {}
+    assert cache.yearly_mean_close(["GOTO.JK"], 2023) == {}
+    assert len(source.requested) == 1
+
+    # Eight days later the negative entry is evicted and the ticker-year is asked for again
+    cache._connection().execute("UPDATE yearly_close SET fetched_at = ?", (time.time() - 8 * 86400,))
+    cache.evict()
+    assert cache.yearly_mean_close(["GOTO.JK"], 2023) == {"GOTO.JK": (80.0, 120)}
+
+
+def test_eviction_keeps_the_most_recently_used_entries(tmp_path):
+    source = ScriptedSource({"AAAA.JK": (1.0, 1), "BBBB.JK": (2.0, 1), "CCCC.JK": (3.0, 1)})
+    cache = _cache(tmp_path, source, max_entries=2)
+    cache.yearly_mean_close(["AAAA.JK", "BBBB.JK", "CCCC.JK"], 2023)
+
+    conn = cache._connection()
+    conn.execute("UPDATE yearly_close SET last_used = ? WHERE ticker = 'BBBB.JK'", (time.time() - 60,))
+    cache.evict()
+    assert {ticker for ticker, in conn.execute("SELECT ticker FROM yearly_close")} == {"AAAA.JK", "CCCC.JK"}
+
+    # Entries past max_age_days go regardless of use
+    conn.execute("UPDATE yearly_close SET fetched_at = ? WHERE ticker = 'AAAA.JK'", (time.time() - 400 * 86400,))
+    cache.evict()
+    assert {ticker for ticker, in conn.execute("SELECT ticker FROM yearly_close")} == {"CCCC.JK"}
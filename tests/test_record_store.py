@@ -0,0 +1,65 @@
+import math
+
+from record_store import DIVIDEND_SCHEMA, RecordStore, read_archive
+
+
+_RECORDS = [
+    {"symbol": "BBCA.JK", "date": "2024-09-25", "dividend": 135.0, "dividend_original": 135.0,
+     "cum_date": "2024-09-24", "recording_date": "2024-09-26", "payment_date": "2024-10-10",
+     "updated_on": "2024-09-20 11:00:00"},
+    {"symbol": "BMRI.JK", "date": "2024-09-26", "dividend": None, "dividend_original": None,
+     "cum_date": None, "recording_date": None, "payment_date": None,
+     "updated_on": "2024-09-20 11:00:00"},
+]
+
+
+def test_records_round_trip_through_the_store():
+    store = RecordStore()
+    store.extend(_RECORDS)
+    assert len(store) == 2
+    assert list(store) == _RECORDS
+
+
+def test_missing_values_are_nulls_in_arrow():
+    store = RecordStore()
+    store.extend(_RECORDS)
+    missing = store.to_arrow().to_pylist()[1]
+
+    assert missing["dividend"] is None
+    assert missing["dividend_original"] is None
+    assert missing["payment_date"] is None
+
+
+def test_parquet_archive_round_trip(tmp_path):
+    first, second = RecordStore(), RecordStore()
+    first.extend(_RECORDS[:1])
+    second.extend(_RECORDS)
+    first.write_parquet(tmp_path, run_date="2024-09-19")
+    second.write_parquet(tmp_path, run_date="2024-09-20")
+
+    everything = read_archive(tmp_path)
+    assert len(everything) == 3
+
+    latest = read_archive(tmp_path, since="2024-09-20", columns=["symbol", "dividend", "payment_date"])
+    assert sorted(latest["symbol"].astype(str)) == ["BBCA.JK", "BMRI.JK"]
+    bmri = latest[latest["symbol"] == "BMRI.JK"].iloc[0]
+    assert math.isnan(bmri["dividend"])
+    assert bmri["payment_date"] != bmri["payment_date"]  # NaT
+
+    # Rerunning a day replaces its partition
+    second.write_parquet(tmp_path, run_date="2024-09-20")
+    assert len(read_archive(tmp_path)) == 3
+
+
+def test_csv_snapshot_with_site_dates(tmp_path):
+    path = tmp_path / "retrieved_records.csv"
+    path.write_text("symbol,date,dividend,dividend_original,recording_date,cum_date,updated_on,yield\n"
+                    "BBCA.JK,08-Aug-2024,135.0,135.0,09-Aug-2024,07-Aug-2024,2024-08-01 10:00:00,0.01\n"
+                    "BMRI.JK,2024-08-09,,,,,2024-08-01 10:00:00,\n")
+
+    store = RecordStore.from_csv(path, DIVIDEND_SCHEMA)
+    bbca, bmri = list(store)
+    assert (bbca["date"], bbca["cum_date"], bbca["recording_date"]) == ("2024-08-08", "2024-08-07", "2024-08-09")
+    assert bbca["dividend"] == 135.0 and bbca["payment_date"] is None
+    assert bmri["date"] == "2024-08-09" and bmri["dividend"] is None
+    assert "yield" not in bbca
@@ -0,0 +1,29 @@
+from offline         import FakeSupabase
+from symbol_universe import SymbolUniverse
+
+
+def test_a_missing_symbol_reloads_the_universe_once_per_ttl(tmp_path):
+    supabase = FakeSupabase({"idx_company_profile": [{"symbol": "BBCA.JK"}, {"symbol": "BMRI.JK"}]})
+    path = tmp_path / "symbols.json"
+
+    first_run = SymbolUniverse(supabase, path=path)
+    assert "BBCA" in first_run
+    assert "XXXX" not in first_run
+    assert first_run.db_calls == 1
+
+    # A later run reads the cache and already knows XXXX is not in idx_company_profile
+    second_run = SymbolUniverse(supabase, path=path)
+    assert "XXXX" not in second_run
+    assert "BMRI" in second_run
+    assert second_run.db_calls == 0
+
+
+def test_a_newly_listed_symbol_is_picked_up_from_a_cached_universe(tmp_path):
+    supabase = FakeSupabase({"idx_company_profile": [{"symbol": "BBCA.JK"}]})
+    path = tmp_path / "symbols.json"
+    assert "BBCA" in SymbolUniverse(supabase, path=path)
+
+    supabase.tables["idx_company_profile"].append({"symbol": "CDIA.JK"})
+    later_run = SymbolUniverse(supabase, path=path)
+    assert "CDIA" in later_run
+    assert later_run.db_calls == 1
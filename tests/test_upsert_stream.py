@@ -0,0 +1,48 @@
+from contextlib import closing
+from datetime   import timedelta
+
+import json
+import pytest
+import requests
+
+from dividend_checker import DividendChecker
+from fetcher          import PageFetcher
+from symbol_universe  import SymbolUniverse
+
+
+class FailingFetcher(PageFetcher):
+    def __init__(self, url_template: str, failing_page: int | None):
+        super().__init__(url_template, rate=10000, burst=10000, max_retries=0)
+        self.failing_page = failing_page
+        self.pages_requested = []
+
+    def fetch(self, page, stop_event=None, headers=None):
+        self.pages_requested.append(page)
+        if page == self.failing_page:
+            raise requests.exceptions.ConnectionError(f"page {page} unreachable")
+        return super().fetch(page, stop_event, headers)
+
+
+def _checker(server, supabase, today, failing_page=None) -> DividendChecker:
+    checker = DividendChecker(supabase,
+                              fetcher=FailingFetcher(server.url_template, failing_page),
+                              allowed_symbols=SymbolUniverse(supabase, path=".cache/symbols.json"))
+    checker.start_date = (today - timedelta(days=29)).isoformat()
+    checker.end_date = today.isoformat()
+    return checker
+
+
+def test_interrupted_stream_resumes_after_the_last_acknowledged_page(server, supabase, today):
+    checker = _checker(server, supabase, today, failing_page=3)
+    with closing(checker.fetcher), pytest.raises(requests.exceptions.ConnectionError):
+        checker.upsert_stream(include_payment_date=True, batch_size=10)
+    assert json.loads(checker.checkpoint_path.read_text())["page"] == 2
+    written_before = len(supabase.tables["idx_dividend"])
+
+    resumed = _checker(server, supabase, today)
+    with closing(resumed.fetcher):
+        written = resumed.upsert_stream(include_payment_date=True, batch_size=10)
+
+    assert min(resumed.fetcher.pages_requested) == 3
+    assert not resumed.checkpoint_path.exists()
+    assert written_before + written == len(supabase.tables["idx_dividend"])
@@ -0,0 +1,148 @@
+from pathlib import Path
+
+import hashlib
+import json
+import logging
+import os
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+def content_hash(value) -> str:
+    """
+    Stable hash of a JSON-serialisable value.
+    """
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class CrawlWatermark:
+    def __init__(self, path: str | Path):
+        """
+        High-water mark of an incremental crawl, persisted as JSON.
+
+        Keeps the newest ex-date seen, a content hash plus ETag/Last-Modified per page,
+        a hash per record in the window and the window of the last committed run, so the
+        next run can send conditional requests, stop at the first unchanged page and skip
+        unchanged records. Once the window moved, a page may only end the crawl if neither
+        it nor the older pages after it can hold an ex-date the last run did not cover.
+        Changes are only written by save(), i.e. once the records reached the database.
+
+        Args:
+            path (str | Path): Watermark file location.
+        """
+        self.path = Path(path)
+        try:
+            state = json.loads(self.path.read_text())
+        except FileNotFoundError:
+            state = {}
+        except (OSError, ValueError) as error:
+            LOGGER.warning(f"Ignoring unreadable watermark {self.path}: {error}")
+            state = {}
+
+        self.newest_ex_date: str | None = state.get("newest_ex_date")
+        self.pages: dict[str, dict] = state.get("pages", {})
+        self.records: dict[str, str] = state.get("records", {})
+        # Window of the last committed run, and of the current one (see begin_window)
+        self.start_date: str | None = state.get("start_date")
+        self.end_date: str | None = state.get("end_date")
+        self._window: tuple[str, str] | None = None
+
+    def begin_window(self, start_date: str, end_date: str):
+        """
+        Sets the ex-date window of the current crawl, committed as the last run's window by save().
+        """
+        self._window = (start_date, end_date)
+
+    @property
+    def same_window(self) -> bool:
+        """
+        True if the current crawl covers the same window as the last committed run.
+        """
+        return self._window is not None and self._window == (self.start_date, self.end_date)
+
+    def has_new_dates(self, up_to: str) -> bool:
+        """
+        True if the current window holds an ex-date up to `up_to` (inclusive) that lies outside
+        the last committed run's window. Always True when no window was committed yet.
+        """
+        start_date, end_date = self._window
+        end_date = min(end_date, up_to)
+        if start_date > end_date:
+            return False
+        if self.start_date is None or self.end_date is None:
+            return True
+        return start_date < self.start_date or end_date > self.end_date
+
+    def can_stop(self, page_hash: str, ex_dates: list[str]) -> bool:
+        """
+        True if the crawl may stop at this page: its content was already seen and, when the window
+        moved since the last run, no ex-date new to the window can be on it or on the older pages after it.
+        """
+        if not self.page_unchanged(page_hash):
+            return False
+        if self.same_window:
+            return True
+        # The listing is sorted by ex-date descending, so this page and the next ones hold dates up to its newest
+        return bool(ex_dates) and not self.has_new_dates(max(ex_dates))
+
+    def conditional_headers(self, page: int) -> dict:
+        """
+        Returns If-None-Match / If-Modified-Since headers for a page seen before. None are sent
+        once the window moved, since a 304 would hide the rows that just entered it.
+        """
+        if not self.same_window:
+            return {}
+        stored = self.pages.get(str(page), {})
+        headers = {}
+        if stored.get("etag"):
+            headers["If-None-Match"] = stored["etag"]
+        if stored.get("last_modified"):
+            headers["If-Modified-Since"] = stored["last_modified"]
+        return headers
+
+    def page_unchanged(self, page_hash: str) -> bool:
+        """
+        True if the page content was already seen, at this page number or a shifted one.
+        """
+        return any(stored["hash"] == page_hash for stored in self.pages.values())
+
+    def update_page(self, page: int, page_hash: str, response, newest_ex_date: str | None):
+        self.pages[str(page)] = {
+            "hash": page_hash,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }
+        if newest_ex_date and (self.newest_ex_date is None or newest_ex_date > self.newest_ex_date):
+            self.newest_ex_date = newest_ex_date
+
+    def record_changed(self, record: dict) -> bool:
+        """
+        True if the record is new or differs from the stored one. Ignores updated_on.
+        """
+        key = f"{record['symbol']}|{record['date']}"
+        record_hash = content_hash({k: v for k, v in record.items() if k != "updated_on"})
+        if self.records.get(key) == record_hash:
+            return False
+        self.records[key] = record_hash
+        return True
+
+    def prune(self, start_date: str):
+        """
+        Forgets record hashes dated before start_date, which no crawl window can return anymore.
+        """
+        self.records = {key: value for key, value in self.records.items() if key.split("|")[1] >= start_date}
+
+    def save(self):
+        if self._window:
+            self.start_date, self.end_date = self._window
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp_path.write_text(json.dumps({
+            "newest_ex_date": self.newest_ex_date,
+            "pages": self.pages,
+            "records": self.records,
+            "start_date": self.start_date,
+            "end_date": self.end_date,
+        }))
+        os.replace(tmp_path, self.path)